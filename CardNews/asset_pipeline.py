@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Asset pipeline for generated HTML pages
+
+Generated pages (e.g. example1/analyze.html) reference images by content
+hash instead of embedding them as base64 `data:` URIs:
+
+    store = AssetStore("example1")
+    src = store.add("example1/references/image.png")   # -> ".assets/3f2a...e1.png"
+
+Files are hashed and copied into `<root>/.assets/` in fixed-size chunks, so
+large images are never held in memory. Pages that read pixels back from a
+canvas must be served over HTTP (file:// images taint the canvas), which
+`serve` does from the same root, streaming files with long-lived cache
+headers. Base64 is only produced on request by `export`, which writes a
+portable single-file copy with the assets inlined.
+
+Usage:
+    python3 asset_pipeline.py serve <root_dir> [--port N]
+    python3 asset_pipeline.py export <html_file> <output_html>
+
+Example:
+    python3 asset_pipeline.py serve example1      # then open http://127.0.0.1:8765/analyze.html
+"""
+
+import argparse
+import base64
+import mimetypes
+import os
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from pixels import file_digest
+
+STORE_DIR = ".assets"
+CHUNK_SIZE = 1 << 20
+# Multiple of 3 so each chunk encodes to base64 without padding
+B64_CHUNK_SIZE = 3 * (1 << 18)
+
+ASSET_REF = re.compile(r"""(?<=["'(])(?:\./)?\.assets/([0-9a-f]{64}\.[A-Za-z0-9]+)(?=["')])""")
+
+
+class AssetStore:
+    """Content-addressed copies of page assets under `<root>/.assets/`"""
+
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+        self.directory = self.root / STORE_DIR
+
+    def add(self, path: str) -> str:
+        """Store a file and return its URL relative to the root"""
+        path = Path(path)
+        name = f"{file_digest(path)}{path.suffix.lower()}"
+        target = self.directory / name
+        if not target.exists():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_suffix(f".{os.getpid()}.tmp")
+            # A copy, never a hardlink: rewriting the source in place must not
+            # change an entry that is served as immutable
+            with open(path, "rb") as src, open(tmp, "wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            os.replace(tmp, target)
+        return f"{STORE_DIR}/{name}"
+
+    def path(self, name: str) -> Path:
+        return self.directory / name
+
+
+def export_portable(html_path: str, output_path: str) -> int:
+    """Write a single-file copy of a page with its stored assets inlined; returns bytes written"""
+    html_path = Path(html_path).resolve()
+    store = AssetStore(html_path.parent)
+    text = html_path.read_text()
+
+    with open(output_path, "w") as out:
+        position = 0
+        for match in ASSET_REF.finditer(text):
+            out.write(text[position:match.start()])
+            asset = store.path(match.group(1))
+            mime = mimetypes.guess_type(asset.name)[0] or "application/octet-stream"
+            out.write(f"data:{mime};base64,")
+            with open(asset, "rb") as f:
+                for chunk in iter(lambda: f.read(B64_CHUNK_SIZE), b""):
+                    out.write(base64.b64encode(chunk).decode("ascii"))
+            position = match.end()
+        out.write(text[position:])
+    return os.path.getsize(output_path)
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    def end_headers(self):
+        if self.path.startswith(f"/{STORE_DIR}/"):
+            # Content-addressed: the bytes behind a name never change
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        else:
+            self.send_header("Cache-Control", "no-cache")
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_directory(root: str, port: int = 0):
+    """Serve a directory (and its asset store) on localhost; yields the base URL"""
+    handler = partial(_Handler, directory=str(Path(root).resolve()))
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve or export pages built on the asset store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve = subparsers.add_parser("serve", help="serve a directory on localhost")
+    serve.add_argument("root")
+    serve.add_argument("--port", type=int, default=8765)
+    export = subparsers.add_parser("export", help="write a portable single-file HTML")
+    export.add_argument("html_file")
+    export.add_argument("output_html")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        size = export_portable(args.html_file, args.output_html)
+        print(f"✓ Portable page saved to: {args.output_html} ({size / 1024 / 1024:.1f} MB)")
+        return
+
+    with serve_directory(args.root, args.port) as url:
+        print(f"✓ Serving {Path(args.root).resolve()} at {url}/ (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
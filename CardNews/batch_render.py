@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Batch HTML to Image renderer
+
+Renders many cards in one invocation through async Playwright, with a bounded
+number of concurrent pages in a single browser. A failing card is reported
+and skipped; the rest of the batch keeps going.
+
+Usage:
+    python3 batch_render.py --manifest <manifest.json> [--concurrency N]
+    python3 batch_render.py --glob "<pattern>" --out-dir <dir> [--viewport WxH] [--scale N] [--concurrency N]
+    python3 batch_render.py ... --export 2:png,1:jpeg,1:webp   # render once per card, encode while rendering
+    python3 batch_render.py ... --profile --trace batch.trace.json
+
+Manifest format (paths are relative to the manifest file):
+    [
+        {"html": "example2/card_v1.html", "output": "example2/outputs/card_v1.png",
+         "viewport": "720x720", "scale": 2, "full_page": false},
+        ...
+    ]
+
+Example:
+    python3 batch_render.py --glob "example2/card_v*.html" --out-dir example2/outputs --viewport 720x720
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import sys
+import time
+from pathlib import Path
+
+from html_to_image import parse_viewport
+from image_export import Exporter, max_scale, parse_specs, print_report
+from render_profile import Profiler, add_profile_arguments, percentile, report
+from renderer import make_job, new_context, render_on_page
+
+
+def jobs_from_manifest(manifest_path: str) -> list:
+    """Load render jobs from a JSON manifest"""
+    manifest_path = Path(manifest_path).resolve()
+    base = manifest_path.parent
+    jobs = []
+    for item in json.loads(manifest_path.read_text()):
+        viewport = item.get("viewport")
+        if isinstance(viewport, str):
+            viewport = parse_viewport(viewport)
+        jobs.append(make_job(base / item["html"], base / item["output"], viewport,
+                             item.get("scale", 1), item.get("full_page", True)))
+    return jobs
+
+
+def jobs_from_glob(pattern: str, out_dir: str = None, viewport: dict = None, scale: float = 1,
+                   full_page: bool = True) -> list:
+    """Build render jobs for every HTML file matching a glob pattern"""
+    jobs = []
+    for html in sorted(glob.glob(pattern)):
+        html = Path(html)
+        output = Path(out_dir) / f"{html.stem}.png" if out_dir else html.with_suffix(".png")
+        jobs.append(make_job(html, output, viewport, scale, full_page))
+    return jobs
+
+
+async def render_batch(jobs: list, concurrency: int = 4, exporter: Exporter = None) -> list:
+    """Render all jobs with at most `concurrency` pages open at once
+
+    With an exporter, each finished screenshot is handed to its thread pool
+    right away, so encoding overlaps with the remaining renders.
+    """
+    from playwright.async_api import async_playwright
+
+    semaphore = asyncio.Semaphore(concurrency)
+    contexts = {}
+    context_lock = asyncio.Lock()
+
+    async def context_for(browser, scale):
+        async with context_lock:
+            if scale not in contexts:
+                contexts[scale] = await new_context(browser, scale)
+            return contexts[scale]
+
+    async def run(browser, job):
+        async with semaphore:
+            started = time.perf_counter()
+            page = None
+            try:
+                context = await context_for(browser, job["scale"])
+                page = await context.new_page()
+                result = await render_on_page(page, job)
+                result["ok"] = True
+                if exporter is not None:
+                    exporter.submit(result["output_path"], job["scale"])
+            except Exception as exc:
+                result = {"ok": False, "error": str(exc)}
+            finally:
+                # A dead browser must not turn one card's failure into the batch's
+                if page is not None and not page.is_closed():
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+            result["html_path"] = job["html_path"]
+            result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            if result["ok"]:
+                print(f"✓ {result['output_path']} ({result['latency_ms']} ms)")
+            else:
+                print(f"✗ {job['html_path']}: {result['error']}")
+            return result
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch()
+        results = await asyncio.gather(*(run(browser, job) for job in jobs))
+        await browser.close()
+    return results
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    """Throughput and latency summary for a finished batch"""
+    latencies = [r["latency_ms"] for r in results if r["ok"]]
+    return {
+        "cards": len(results),
+        "ok": len(latencies),
+        "failed": len(results) - len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "cards_per_sec": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render many HTML cards in one invocation")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="JSON manifest of render jobs")
+    source.add_argument("--glob", help="glob pattern of HTML files")
+    parser.add_argument("--out-dir", help="output directory for --glob (default: next to each HTML)")
+    parser.add_argument("--viewport", type=parse_viewport, help="viewport size for --glob, e.g. 720x720")
+    parser.add_argument("--scale", type=float, default=1, help="device scale factor for --glob")
+    parser.add_argument("--viewport-only", action="store_true",
+                        help="capture only the viewport for --glob")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent pages")
+    parser.add_argument("--export", type=parse_specs, metavar="SPECS",
+                        help="SCALE:FORMAT[:QUALITY] outputs per card, e.g. 2:png,1:webp (overrides scales)")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if args.manifest:
+        jobs = jobs_from_manifest(args.manifest)
+    else:
+        jobs = jobs_from_glob(args.glob, args.out_dir, args.viewport, args.scale, not args.viewport_only)
+    if not jobs:
+        print("Error: no HTML files to render")
+        sys.exit(1)
+
+    for job in jobs:
+        job["metrics"] = args.metrics
+
+    exporter = None
+    if args.export:
+        exporter = Exporter(args.export)
+        for job in jobs:
+            job["scale"] = max_scale(args.export)
+
+    started = time.perf_counter()
+    results = asyncio.run(render_batch(jobs, args.concurrency, exporter))
+    if exporter is not None:
+        print_report(exporter.results())
+    summary = summarize(results, time.perf_counter() - started)
+
+    profiler = Profiler()
+    for result in results:
+        profiler.add(result)
+    report(profiler, args)
+
+    print(
+        f"\n{summary['ok']}/{summary['cards']} cards in {summary['elapsed_s']} s "
+        f"({summary['cards_per_sec']} cards/sec, p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms)"
+    )
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
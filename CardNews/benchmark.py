@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the render and image-analysis paths
+
+Runs offline against the bundled fixtures (example1/references/image.png,
+example2/card_v*.html, example2/target.png) and writes a JSON results file.
+Text bands are measured on the reference with synthetic text blocks drawn
+over it, using the untouched reference as the background plate.
+Remote assets come only from the offline asset cache (CARDNEWS_OFFLINE=1),
+so repeated runs see the same inputs.
+
+Measured:
+    render.cold_ms              browser launch + render, per card
+    render.warm_ms              render on an already-open browser, per card
+    batch.c{N}.cards_per_sec    batch throughput at several concurrency levels
+    analysis.*_ms_per_mp        text bands, edge grids and similarity, per megapixel
+    memory.peak_rss_mb          peak RSS of this process
+    memory.browser_peak_rss_mb  peak summed RSS of the driver and browser process tree (renders only)
+
+Usage:
+    python3 benchmark.py run [--output benchmark.json] [--repeat N] [--concurrency 1,2,4] [--skip-render]
+    python3 benchmark.py compare <baseline.json> <current.json> [--threshold 10]
+
+Example:
+    python3 benchmark.py run --output baseline.json
+    # ...change something...
+    python3 benchmark.py run --output current.json
+    python3 benchmark.py compare baseline.json current.json
+"""
+
+import os
+
+os.environ.setdefault("CARDNEWS_OFFLINE", "1")
+
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+CARDS = sorted((ROOT / "example2").glob("card_v*.html"))
+REFERENCE = ROOT / "example1" / "references" / "image.png"
+TARGET = ROOT / "example2" / "target.png"
+OUTPUT = ROOT / "example2" / "outputs" / "output_v1.png"
+CARD_VIEWPORT = {"width": 720, "height": 720}
+
+
+def summarize(values: list, unit: str, better: str = "lower") -> dict:
+    """Median-centred summary of repeated measurements"""
+    return {
+        "median": round(statistics.median(values), 3),
+        "min": round(min(values), 3),
+        "max": round(max(values), 3),
+        "runs": len(values),
+        "unit": unit,
+        "better": better,
+    }
+
+
+def _timed(fn, repeat: int) -> list:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return times
+
+
+def banded_reference(background):
+    """The background with rows of glyph-like blocks drawn over it, so text_bands() has bands to find"""
+    import numpy as np
+
+    reference = background.copy()
+    h, w = reference.shape[:2]
+    rng = np.random.default_rng(0)
+    line = max(12, h // 40)
+    for block in range(4):
+        top = h // 10 + block * h // 5
+        for row in range(3):
+            y = top + row * line * 2
+            x = w // 10
+            while x < w * 9 // 10:
+                glyph = int(rng.integers(line // 3, line))
+                reference[y:y + line, x:x + glyph, :3] = (20, 20, 20) if block % 2 else (250, 250, 250)
+                x += glyph + line // 4
+    return reference
+
+
+def bench_analysis(repeat: int) -> dict:
+    from edge_density import edge_grids
+    from layout_analysis import text_bands
+    from pixels import load_rgba
+    from similarity import compare
+
+    background = load_rgba(REFERENCE)
+    reference = banded_reference(background)
+    if not text_bands(reference, background):
+        raise RuntimeError("banded reference fixture produced no text bands")
+    target = load_rgba(TARGET)
+    output = load_rgba(OUTPUT)
+    ref_mp = reference.shape[0] * reference.shape[1] / 1e6
+    target_mp = target.shape[0] * target.shape[1] / 1e6
+
+    decode = _timed(lambda: load_rgba(REFERENCE), repeat)
+    bands = _timed(lambda: text_bands(reference, background), repeat)
+    edges = _timed(lambda: edge_grids(reference, [(10, 10), (20, 20), (80, 80)]), repeat)
+    scores = _timed(lambda: compare(target, output), repeat)
+    return {
+        "analysis.decode_ms_per_mp": summarize([t / ref_mp for t in decode], "ms/MP"),
+        "analysis.text_bands_ms_per_mp": summarize([t / ref_mp for t in bands], "ms/MP"),
+        "analysis.edge_grids_ms_per_mp": summarize([t / ref_mp for t in edges], "ms/MP"),
+        "analysis.similarity_ms_per_mp": summarize([t / target_mp for t in scores], "ms/MP"),
+    }
+
+
+async def _bench_render(repeat: int, concurrency_levels: list, workdir: Path) -> dict:
+    from playwright.async_api import async_playwright
+
+    from batch_render import render_batch
+    from renderer import make_job, new_context, render_cold, render_on_page
+
+    jobs = [make_job(card, workdir / f"{card.stem}.png", CARD_VIEWPORT, 1, False) for card in CARDS]
+    results = {}
+
+    cold = []
+    for i in range(repeat):
+        result = await render_cold(jobs[i % len(jobs)])
+        cold.append(result["latency_ms"])
+    results["render.cold_ms"] = summarize(cold, "ms")
+
+    warm = []
+    async with async_playwright() as p:
+        browser = await p.chromium.launch()
+        context = await new_context(browser)
+        page = await context.new_page()
+        await render_on_page(page, jobs[0])  # first render warms caches
+        for i in range(repeat):
+            result = await render_on_page(page, jobs[i % len(jobs)])
+            warm.append(result["latency_ms"])
+        await browser.close()
+    results["render.warm_ms"] = summarize(warm, "ms")
+
+    batch_size = max(8, 2 * max(concurrency_levels))
+    batch_jobs = [
+        make_job(CARDS[i % len(CARDS)], workdir / f"batch_{i}.png", CARD_VIEWPORT, 1, False)
+        for i in range(batch_size)
+    ]
+    for level in concurrency_levels:
+        rates = []
+        for _ in range(max(1, repeat // 2)):
+            started = time.perf_counter()
+            batch = await render_batch(batch_jobs, level)
+            elapsed = time.perf_counter() - started
+            rates.append(sum(r["ok"] for r in batch) / elapsed)
+        results[f"batch.c{level}.cards_per_sec"] = summarize(rates, "cards/s", better="higher")
+    return results
+
+
+def descendants_rss_mb(pid: int) -> float:
+    """Summed RSS of every live descendant of a process (driver, browser, renderers, GPU)"""
+    out = subprocess.run(["ps", "-A", "-o", "pid=,ppid=,rss="], capture_output=True, text=True).stdout
+    children, rss = {}, {}
+    for line in out.splitlines():
+        child, parent, kb = map(int, line.split())
+        children.setdefault(parent, []).append(child)
+        rss[child] = kb
+    total, stack = 0, list(children.get(pid, []))
+    while stack:
+        child = stack.pop()
+        total += rss.get(child, 0)
+        stack.extend(children.get(child, []))
+    return total / 1024
+
+
+class TreeRssSampler:
+    """Samples the RSS of this process's descendants in the background and keeps the peak
+
+    ru_maxrss of RUSAGE_CHILDREN only reports the single largest reaped child,
+    not the sum of Chromium's concurrent processes.
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        pid = os.getpid()
+        while not self._stop.is_set():
+            try:
+                self.peak_mb = max(self.peak_mb, descendants_rss_mb(pid))
+            except (OSError, ValueError):
+                pass
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def peak_rss() -> dict:
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+    return {"memory.peak_rss_mb": summarize([own], "MB")}
+
+
+def run(output: str, repeat: int, concurrency_levels: list, skip_render: bool) -> dict:
+    results = {}
+    print("Analysis benchmarks...")
+    results.update(bench_analysis(repeat))
+
+    if skip_render:
+        print("Render benchmarks skipped")
+    else:
+        print("Render benchmarks...")
+        workdir = Path(tempfile.mkdtemp(prefix="cardnews-bench-"))
+        try:
+            with TreeRssSampler() as sampler:
+                results.update(asyncio.run(_bench_render(repeat, concurrency_levels, workdir)))
+            results["memory.browser_peak_rss_mb"] = summarize([sampler.peak_mb], "MB")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    results.update(peak_rss())
+
+    try:
+        from importlib.metadata import version
+        playwright_version = version("playwright")
+    except Exception:
+        playwright_version = None
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "playwright": playwright_version,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+    Path(output).write_text(json.dumps(report, indent=2))
+
+    for name, values in results.items():
+        print(f"  {name:<36}{values['median']:>12.2f} {values['unit']}")
+    print(f"✓ Results saved to: {output}")
+    return report
+
+
+def compare(baseline_path: str, current_path: str, threshold: float) -> list:
+    """Metrics that got worse than the baseline by more than `threshold` percent"""
+    baseline = json.loads(Path(baseline_path).read_text())["results"]
+    current = json.loads(Path(current_path).read_text())["results"]
+    regressions = []
+    for name, now in current.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"  {name:<36}{'new':>12}")
+            continue
+        if before["median"]:
+            change = (now["median"] - before["median"]) / before["median"] * 100
+        else:
+            # No relative change from zero: any move in the wrong direction counts
+            change = 0.0 if not now["median"] else float("inf") if now["median"] > 0 else float("-inf")
+        worse = change > threshold if now["better"] == "lower" else change < -threshold
+        flag = "  REGRESSION" if worse else ""
+        print(f"  {name:<36}{before['median']:>12.2f} -> {now['median']:>10.2f} {now['unit']:<8}"
+              f"{change:+7.1f}%{flag}")
+        if worse:
+            regressions.append(name)
+    for name in sorted(baseline.keys() - current.keys()):
+        print(f"  {name:<36}{'missing':>12}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the render and analysis paths")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--output", default="benchmark.json")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--concurrency", default="1,2,4", help="batch concurrency levels")
+    run_parser.add_argument("--skip-render", action="store_true", help="only run the analysis benchmarks")
+    compare_parser = subparsers.add_parser("compare", help="compare results against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=10, help="allowed slowdown in percent")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        levels = [int(level) for level in args.concurrency.split(",")]
+        run(args.output, args.repeat, levels, args.skip_render)
+        return
+
+    regressions = compare(args.baseline, args.current, args.threshold)
+    if regressions:
+        print(f"✗ {len(regressions)} regressions beyond {args.threshold:g}%: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"✓ No regressions beyond {args.threshold:g}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Layout descriptors for a corpus of reference images
+
+Runs the text band and edge density analysis over many reference images on a
+process pool and writes one descriptor JSON per image plus a combined
+`index.json`. Text bands need a background plate: either --background for
+every image, or a `background.*` file next to the reference. Without one the
+descriptor only carries edge grids.
+
+Decoded pixels are cached as .npy files keyed by each image's sha256 (see
+pixels.load_rgba_cached), so re-running with other thresholds or grids skips
+decoding entirely.
+
+Usage:
+    python3 corpus_analysis.py <dir|image|glob> ... [--out corpus] [--workers N]
+        [--background IMAGE] [--size WxH|native] [--grid RxC ...] [--diff-threshold 40]
+        [--noise 5] [--min-band 8] [--edge-threshold 20] [--pixel-cache DIR]
+
+Example:
+    python3 corpus_analysis.py references/ --out corpus --grid 10x10 --grid 20x20
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+from edge_density import ascii_grid, edge_grids, parse_grid
+from layout_analysis import parse_size, text_bands
+from pixels import DEFAULT_CACHE_DIR, file_digest, load_rgba_cached
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+
+
+def find_images(inputs: list) -> list:
+    """Reference images under the given directories, files and globs; background plates excluded"""
+    images = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            candidates = sorted(p for p in path.rglob("*") if p.is_file())
+        elif path.is_file():
+            candidates = [path]
+        else:
+            candidates = sorted(Path(p) for p in glob.glob(item, recursive=True))
+        images.extend(p for p in candidates
+                      if p.suffix.lower() in IMAGE_SUFFIXES and p.stem.lower() != "background")
+    return list(dict.fromkeys(p.resolve() for p in images))
+
+
+def background_for(image_path: Path, background: str = None):
+    """Explicit background, else a `background.*` next to the image, else None"""
+    if background:
+        return Path(background)
+    for suffix in sorted(IMAGE_SUFFIXES):
+        candidate = image_path.with_name(f"background{suffix}")
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def describe(image_path: str, params: dict) -> dict:
+    """Layout descriptor of one reference image; runs in a worker process"""
+    started = time.perf_counter()
+    cache_dir = params["pixel_cache"]
+    digest = file_digest(Path(image_path))
+    reference = load_rgba_cached(image_path, params["size"], cache_dir, digest)
+    size = (reference.shape[1], reference.shape[0])
+
+    background_path = background_for(Path(image_path), params["background"])
+    bands = None
+    if background_path is not None:
+        background = load_rgba_cached(background_path, size, cache_dir)
+        bands = text_bands(reference, background, params["diff_threshold"], params["noise"], params["min_band"])
+
+    grids = edge_grids(reference, params["grids"], params["edge_threshold"])
+    return {
+        "image": str(image_path),
+        "sha256": digest,
+        "size": list(size),
+        "background": str(background_path) if background_path else None,
+        "text_bands": bands,
+        "edges": {
+            f"{rows}x{cols}": {
+                "ascii": ascii_grid(density, params["threshold"]).split("\n"),
+                "density": np.round(density, 4).tolist(),
+            }
+            for (rows, cols), density in grids.items()
+        },
+        "params": {
+            "diff_threshold": params["diff_threshold"],
+            "noise": params["noise"],
+            "min_band": params["min_band"],
+            "edge_threshold": params["edge_threshold"],
+        },
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def descriptor_name(descriptor: dict) -> str:
+    return f"{Path(descriptor['image']).stem}-{descriptor['sha256'][:12]}.json"
+
+
+def analyze_corpus(images: list, out_dir: Path, params: dict, workers: int = None) -> list:
+    """Describe every image on a process pool; writes descriptors and index.json, returns the index"""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index, failed = [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(describe, str(path), params): path for path in images}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                descriptor = future.result()
+            except Exception as e:
+                failed.append(str(path))
+                print(f"✗ {path}: {e}", file=sys.stderr)
+                continue
+            name = descriptor_name(descriptor)
+            (out_dir / name).write_text(json.dumps(descriptor, indent=2))
+            bands = descriptor["text_bands"]
+            index.append({
+                "image": descriptor["image"],
+                "descriptor": name,
+                "sha256": descriptor["sha256"],
+                "size": descriptor["size"],
+                "bands": len(bands) if bands is not None else None,
+                "edge_density": {
+                    grid: round(float(np.mean(values["density"])), 4)
+                    for grid, values in descriptor["edges"].items()
+                },
+                "elapsed_ms": descriptor["elapsed_ms"],
+            })
+
+    index.sort(key=lambda entry: entry["image"])
+    (out_dir / "index.json").write_text(json.dumps({"images": index, "failed": sorted(failed)}, indent=2))
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Layout descriptors for a corpus of reference images")
+    parser.add_argument("inputs", nargs="+", help="directories, images or glob patterns")
+    parser.add_argument("--out", default="corpus", help="descriptor output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--background", help="background plate for every image (default: background.* next to it)")
+    parser.add_argument("--size", type=parse_size, default=None,
+                        help="analysis size WxH, or `native` (default: native)")
+    parser.add_argument("--grid", type=parse_grid, action="append",
+                        help="edge grid size ROWSxCOLS, repeatable (default: 20x20)")
+    parser.add_argument("--diff-threshold", type=int, default=40, help="summed RGB difference for content")
+    parser.add_argument("--noise", type=int, default=5, help="differing pixels a row needs to count")
+    parser.add_argument("--min-band", type=int, default=8, help="bands must be taller than this")
+    parser.add_argument("--edge-threshold", type=float, default=20, help="luminance step for an edge")
+    parser.add_argument("--threshold", type=float, default=0.05, help="density cutoff for `#`")
+    parser.add_argument("--pixel-cache", default=str(DEFAULT_CACHE_DIR), help="decoded pixel cache directory")
+    args = parser.parse_args()
+
+    images = find_images(args.inputs)
+    if not images:
+        print("✗ No reference images found", file=sys.stderr)
+        sys.exit(1)
+
+    params = {
+        "background": args.background,
+        "size": args.size,
+        "grids": args.grid or [(20, 20)],
+        "diff_threshold": args.diff_threshold,
+        "noise": args.noise,
+        "min_band": args.min_band,
+        "edge_threshold": args.edge_threshold,
+        "threshold": args.threshold,
+        "pixel_cache": args.pixel_cache,
+    }
+    started = time.perf_counter()
+    index = analyze_corpus(images, Path(args.out), params, args.workers)
+    elapsed = time.perf_counter() - started
+
+    print(f"✓ {len(index)}/{len(images)} images in {elapsed:.2f}s "
+          f"({len(index) / elapsed:.1f} images/sec), index: {Path(args.out) / 'index.json'}")
+    if len(index) < len(images):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Dirty-region partial re-render
+
+In the refine loop one edit usually touches one headline or block. In dirty
+mode a render records every element's bounding box and a style/text
+signature next to its PNG (`<output>.boxes.json`). The next render against
+that PNG compares the new snapshot with the old one. Only the union of the
+old and new boxes of changed elements is captured with
+`page.screenshot(clip=...)` and patched into a copy of the previous image.
+With a target image, only the tiles under those regions are re-scored and the
+other tile scores are carried over.
+
+The snapshot records the sha256 of the PNG it describes, so a PNG rewritten
+by a normal render or a cache hit is never patched against a stale snapshot.
+The render falls back to a full screenshot when there is no usable snapshot
+(missing, stale, different viewport, scale or document size) or when the
+changed area is too large to be worth clipping.
+
+Used through html_to_image.py --dirty [PREVIOUS_PNG] [--target TARGET_IMAGE].
+"""
+
+import io
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from pixels import file_digest
+
+# Computed styles that change pixels without changing an element's box
+STYLE_PROPS = (
+    "color", "background", "font", "letter-spacing", "word-spacing", "text-shadow", "text-decoration",
+    "text-transform", "box-shadow", "border", "border-radius", "outline", "opacity", "transform",
+    "filter", "backdrop-filter", "clip-path", "mix-blend-mode", "visibility", "z-index", "object-fit",
+    "object-position",
+)
+
+BOXES_SCRIPT = """
+(styleProps) => {
+    const skip = new Set(['HEAD', 'SCRIPT', 'STYLE', 'META', 'LINK', 'TITLE', 'NOSCRIPT', 'TEMPLATE']);
+    const sx = window.scrollX;
+    const sy = window.scrollY;
+    const boxes = [];
+
+    const walk = (el, path) => {
+        const rect = el.getBoundingClientRect();
+        const style = getComputedStyle(el);
+        let text = '';
+        for (const node of el.childNodes) {
+            if (node.nodeType === Node.TEXT_NODE) text += node.textContent;
+        }
+        const signature = [
+            el.tagName, text, el.currentSrc || el.getAttribute('src') || '',
+            getComputedStyle(el, '::before').content, getComputedStyle(el, '::after').content,
+            ...styleProps.map(prop => style.getPropertyValue(prop)),
+        ].join('\\u0001');
+        boxes.push({path, box: [rect.left + sx, rect.top + sy, rect.width, rect.height], signature});
+        Array.from(el.children).forEach((child, i) => {
+            if (!skip.has(child.tagName)) walk(child, `${path}/${i}:${child.tagName}`);
+        });
+    };
+    walk(document.documentElement, 'HTML');
+
+    const root = document.documentElement;
+    return {boxes, width: root.scrollWidth, height: root.scrollHeight};
+}
+"""
+
+
+def snapshot_path(image_path: str) -> Path:
+    return Path(image_path).with_suffix(".boxes.json")
+
+
+def load_snapshot(image_path: str):
+    """The snapshot next to a PNG, or None if missing or written for other pixels"""
+    path = snapshot_path(image_path)
+    if not path.exists() or not Path(image_path).exists():
+        return None
+    snapshot = json.loads(path.read_text())
+    if snapshot.get("image_sha256") != file_digest(Path(image_path)):
+        return None
+    return snapshot
+
+
+def save_snapshot(image_path: str, snapshot: dict):
+    snapshot["image_sha256"] = file_digest(Path(image_path))
+    snapshot_path(image_path).write_text(json.dumps(snapshot))
+
+
+async def collect_boxes(page) -> dict:
+    """Bounding box and signature of every rendered element, in CSS page coordinates"""
+    return await page.evaluate(BOXES_SCRIPT, list(STYLE_PROPS))
+
+
+def merge_rects(rects: list) -> list:
+    """Merge overlapping [x0, y0, x1, y1] rectangles until none overlap"""
+    rects = [list(r) for r in rects]
+    merged = True
+    while merged:
+        merged = False
+        out = []
+        for rect in rects:
+            for other in out:
+                if rect[0] <= other[2] and other[0] <= rect[2] and rect[1] <= other[3] and other[1] <= rect[3]:
+                    other[:] = [min(rect[0], other[0]), min(rect[1], other[1]),
+                                max(rect[2], other[2]), max(rect[3], other[3])]
+                    merged = True
+                    break
+            else:
+                out.append(rect)
+        rects = out
+    return rects
+
+
+def dirty_rects(previous: dict, current: dict, bounds: tuple, margin: int = 8) -> list:
+    """Integer CSS-pixel rectangles covering every element whose box or signature changed"""
+    width, height = bounds
+    old = {entry["path"]: entry for entry in previous["boxes"]}
+    new = {entry["path"]: entry for entry in current["boxes"]}
+    rects = []
+    for path in old.keys() | new.keys():
+        a, b = old.get(path), new.get(path)
+        if a is not None and b is not None and a["box"] == b["box"] and a["signature"] == b["signature"]:
+            continue
+        for entry in (a, b):
+            if entry is None:
+                continue
+            x, y, w, h = entry["box"]
+            if w <= 0 or h <= 0:
+                continue
+            rect = [max(0, math.floor(x) - margin), max(0, math.floor(y) - margin),
+                    min(width, math.ceil(x + w) + margin), min(height, math.ceil(y + h) + margin)]
+            if rect[0] < rect[2] and rect[1] < rect[3]:
+                rects.append(rect)
+    return merge_rects(rects)
+
+
+async def capture(page, job: dict, timer) -> dict:
+    """Screenshot for a dirty-mode job: clipped and patched when possible, full otherwise"""
+    output_path = Path(job["output_path"])
+    scale = job["scale"]
+    with timer.span("boxes"):
+        current = await collect_boxes(page)
+    current.update({"viewport": job["viewport"], "scale": scale, "full_page": job["full_page"]})
+    if job["full_page"]:
+        bounds = (current["width"], current["height"])
+    else:
+        bounds = (job["viewport"]["width"], job["viewport"]["height"])
+
+    previous_path = job.get("dirty") or None
+    previous = load_snapshot(previous_path) if previous_path else None
+    reason = None
+    if previous is None:
+        reason = "no snapshot matching the previous image"
+    elif any(previous.get(key) != current[key] for key in ("viewport", "scale", "full_page")) or (
+            job["full_page"] and (previous["width"], previous["height"]) != bounds):
+        reason = "viewport, scale or page size changed"
+
+    rects = []
+    if reason is None:
+        rects = dirty_rects(previous, current, bounds)
+        area = sum((r[2] - r[0]) * (r[3] - r[1]) for r in rects)
+        if area > 0.6 * bounds[0] * bounds[1]:
+            reason = "most of the page changed"
+
+    if reason is not None:
+        with timer.span("screenshot"):
+            image = await page.screenshot(full_page=job["full_page"])
+        with timer.span("write"):
+            output_path.write_bytes(image)
+        rects = [[0, 0, bounds[0], bounds[1]]]
+    else:
+        with Image.open(previous_path) as img:
+            base = np.array(img.convert("RGBA"))
+        with timer.span("screenshot"):
+            for x0, y0, x1, y1 in rects:
+                clip = await page.screenshot(
+                    full_page=job["full_page"],
+                    clip={"x": x0, "y": y0, "width": x1 - x0, "height": y1 - y0},
+                )
+                with Image.open(io.BytesIO(clip)) as img:
+                    patch = np.asarray(img.convert("RGBA"))
+                top, left = round(y0 * scale), round(x0 * scale)
+                ph = min(patch.shape[0], base.shape[0] - top)
+                pw = min(patch.shape[1], base.shape[1] - left)
+                base[top:top + ph, left:left + pw] = patch[:ph, :pw]
+        with timer.span("write"):
+            Image.fromarray(base).save(output_path)
+
+    current["rects"] = rects
+    save_snapshot(output_path, current)
+    area = sum((r[2] - r[0]) * (r[3] - r[1]) for r in rects)
+    return {
+        "previous": previous_path,
+        "full": reason is not None,
+        "reason": reason,
+        "rects": rects,
+        "area_ratio": round(area / (bounds[0] * bounds[1]), 4),
+    }
+
+
+def score_dirty(target_path: str, output_path: str, dirty: dict, tiles: int = 8, top: int = 5) -> dict:
+    """Score a dirty-mode render, re-scoring only the tiles under its changed regions"""
+    from pixels import load_rgba, load_rgba_cached
+    from similarity import aligned_size, summarize, tile_bounds, tile_stats
+
+    # The target is decoded once across iterations; only dirty tiles get resized
+    target, output = load_rgba_cached(target_path), load_rgba(output_path)
+    w, h = aligned_size(target, output)
+    snapshot = load_snapshot(output_path)
+    previous = load_snapshot(dirty["previous"]) if dirty.get("previous") else None
+    carried = (previous or {}).get("scores")
+
+    if dirty["full"] or snapshot is None or carried is None or carried["target"] != str(Path(target_path).resolve()) \
+            or carried["tiles"] != tiles or carried["size"] != [w, h]:
+        tile_ssim, tile_diff = tile_stats(target, output, tiles)
+        rescored = tiles * tiles
+    else:
+        # CSS rects -> aligned image pixels
+        factor = w / (snapshot["viewport"]["width"] if not snapshot["full_page"] else snapshot["width"])
+        ys, xs = tile_bounds(h, tiles), tile_bounds(w, tiles)
+        cells = set()
+        for x0, y0, x1, y1 in dirty["rects"]:
+            rows = np.flatnonzero((ys[:-1] < y1 * factor) & (ys[1:] > y0 * factor))
+            cols = np.flatnonzero((xs[:-1] < x1 * factor) & (xs[1:] > x0 * factor))
+            cells.update((int(r), int(c)) for r in rows for c in cols)
+        tile_ssim, tile_diff = tile_stats(target, output, tiles, sorted(cells))
+        old_ssim, old_diff = np.array(carried["tile_ssim"]), np.array(carried["tile_diff"])
+        tile_ssim = np.where(np.isnan(tile_ssim), old_ssim, tile_ssim)
+        tile_diff = np.where(np.isnan(tile_diff), old_diff, tile_diff)
+        rescored = len(cells)
+
+    if snapshot is not None:
+        snapshot["scores"] = {
+            "target": str(Path(target_path).resolve()),
+            "tiles": tiles,
+            "size": [w, h],
+            "tile_ssim": tile_ssim.tolist(),
+            "tile_diff": tile_diff.tolist(),
+        }
+        save_snapshot(output_path, snapshot)
+
+    result = summarize(tile_ssim, tile_diff, (w, h), top)
+    result["rescored_tiles"] = rescored
+    return result
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Edge density grid for reference promo images
+
+NumPy port of example1/analyze_edges.html. A pixel is an edge when its
+luminance (0.299 R + 0.587 G + 0.114 B) differs by more than 20 from its
+right or lower neighbour. Unlike the JS version, every pixel is checked, any
+image size works, and cells are summed through an integral image, so one
+pass serves every grid size.
+
+Usage:
+    python3 edge_density.py <image> [--grid RxC ...] [--threshold 0.05] [--edge-threshold 20] [--json]
+
+Example:
+    python3 edge_density.py example1/references/image.png --grid 10x10 --grid 20x20 --grid 80x80
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from pixels import load_rgba
+
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def edge_mask(image: np.ndarray, edge_threshold: float = 20) -> np.ndarray:
+    """Pixels whose luminance jumps past the threshold towards the right or lower neighbour"""
+    lum = image[..., :3].astype(np.float32) @ LUMA_WEIGHTS
+    edges = np.zeros(lum.shape, dtype=bool)
+    edges[:, :-1] = np.abs(lum[:, :-1] - lum[:, 1:]) > edge_threshold
+    edges[:-1, :] |= np.abs(lum[:-1, :] - lum[1:, :]) > edge_threshold
+    return edges
+
+
+def integral_image(mask: np.ndarray) -> np.ndarray:
+    """Summed-area table with a zero row and column in front"""
+    table = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=np.int64)
+    np.cumsum(np.cumsum(mask, axis=0, dtype=np.int64), axis=1, out=table[1:, 1:])
+    return table
+
+
+def density_grid(table: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    """Fraction of edge pixels in each cell of a rows x cols grid"""
+    h, w = table.shape[0] - 1, table.shape[1] - 1
+    ys = np.arange(rows + 1) * h // rows
+    xs = np.arange(cols + 1) * w // cols
+    corners = table[np.ix_(ys, xs)]
+    counts = corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+    areas = np.outer(np.diff(ys), np.diff(xs))
+    return counts / np.maximum(areas, 1)
+
+
+def ascii_grid(density: np.ndarray, threshold: float = 0.05) -> str:
+    """`#` for cells above the density threshold, `.` otherwise"""
+    return "\n".join("".join("#" if value > threshold else "." for value in row) for row in density)
+
+
+def edge_grids(image: np.ndarray, grids: list = ((20, 20),), edge_threshold: float = 20) -> dict:
+    """Density matrices for several grid sizes from a single edge pass"""
+    table = integral_image(edge_mask(image, edge_threshold))
+    return {(rows, cols): density_grid(table, rows, cols) for rows, cols in grids}
+
+
+def parse_grid(value: str) -> tuple:
+    """Parse ROWSxCOLS such as 20x20"""
+    rows, _, cols = value.lower().partition("x")
+    return (int(rows), int(cols))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Edge density grid of an image")
+    parser.add_argument("image")
+    parser.add_argument("--grid", type=parse_grid, action="append",
+                        help="grid size ROWSxCOLS, repeatable (default: 20x20)")
+    parser.add_argument("--threshold", type=float, default=0.05, help="density cutoff for `#`")
+    parser.add_argument("--edge-threshold", type=float, default=20, help="luminance step for an edge")
+    parser.add_argument("--json", action="store_true", help="print density matrices as JSON")
+    args = parser.parse_args()
+
+    grids = args.grid or [(20, 20)]
+    started = time.perf_counter()
+    image = load_rgba(args.image)
+    results = edge_grids(image, grids, args.edge_threshold)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if args.json:
+        print(json.dumps({
+            f"{rows}x{cols}": {
+                "ascii": ascii_grid(density, args.threshold).split("\n"),
+                "density": np.round(density, 4).tolist(),
+            }
+            for (rows, cols), density in results.items()
+        }, indent=2))
+    else:
+        for (rows, cols), density in results.items():
+            print(f"{rows}x{cols}")
+            print(ascii_grid(density, args.threshold))
+            print()
+    print(f"✓ {image.shape[1]}x{image.shape[0]} image, {len(results)} grids in {elapsed_ms:.1f} ms",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
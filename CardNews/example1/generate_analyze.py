@@ -1,10 +1,17 @@
 
 import os
+import sys
 
-with open('image_b64.txt', 'r') as f:
-    img_b64 = f.read().strip()
-with open('bg_b64.txt', 'r') as f:
-    bg_b64 = f.read().strip()
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))
+
+from asset_pipeline import AssetStore, export_portable
+
+# Images are referenced by content hash; serve this folder with
+# `python3 ../asset_pipeline.py serve .` so the canvas can read them back
+store = AssetStore(script_dir)
+img_src = store.add(os.path.join(script_dir, 'references', 'image.png'))
+bg_src = store.add(os.path.join(script_dir, 'references', 'background.jpg'))
 
 html_content = f"""<!DOCTYPE html>
 <html>
@@ -18,8 +25,8 @@ async function analyze() {{
         img.src = src;
     }});
 
-    const refSrc = "data:image/png;base64,{img_b64}";
-    const bgSrc = "data:image/jpeg;base64,{bg_b64}";
+    const refSrc = "{img_src}";
+    const bgSrc = "{bg_src}";
 
     const [refImg, bgImg] = await Promise.all([
         loadImage(refSrc),
@@ -121,5 +128,8 @@ async function analyze() {{
 </body>
 </html>"""
 
-with open('analyze.html', 'w') as f:
+with open(os.path.join(script_dir, 'analyze.html'), 'w') as f:
     f.write(html_content)
+
+if '--portable' in sys.argv:
+    export_portable(os.path.join(script_dir, 'analyze.html'), os.path.join(script_dir, 'analyze.portable.html'))
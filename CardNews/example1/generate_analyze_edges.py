@@ -1,8 +1,16 @@
 
 import os
+import sys
 
-with open('image_b64.txt', 'r') as f:
-    img_b64 = f.read().strip()
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))
+
+from asset_pipeline import AssetStore, export_portable
+
+# Images are referenced by content hash; serve this folder with
+# `python3 ../asset_pipeline.py serve .` so the canvas can read them back
+store = AssetStore(script_dir)
+img_src = store.add(os.path.join(script_dir, 'references', 'image.png'))
 
 html_content = f"""<!DOCTYPE html>
 <html>
@@ -16,7 +24,7 @@ async function analyze() {{
         img.src = src;
     }});
 
-    const refSrc = "data:image/png;base64,{img_b64}";
+    const refSrc = "{img_src}";
     const img = await loadImage(refSrc);
 
     const w = 1440;
@@ -72,5 +80,8 @@ async function analyze() {{
 </body>
 </html>"""
 
-with open('analyze_edges.html', 'w') as f:
+with open(os.path.join(script_dir, 'analyze_edges.html'), 'w') as f:
     f.write(html_content)
+
+if '--portable' in sys.argv:
+    export_portable(os.path.join(script_dir, 'analyze_edges.html'), os.path.join(script_dir, 'analyze_edges.portable.html'))
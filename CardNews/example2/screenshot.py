@@ -1,23 +1,25 @@
 #!/usr/bin/env python3
-from playwright.sync_api import sync_playwright
 import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))
+
+from html_to_image import html_to_image
+from render_profile import Profiler
+
 
 def take_screenshot():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
     html_path = os.path.join(script_dir, 'card_v1.html')
     output_path = os.path.join(script_dir, 'outputs', 'output_v1.png')
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page(viewport={'width': 720, 'height': 720})
-
-        page.goto(f'file://{html_path}')
-        page.wait_for_timeout(1000)  # Wait for fonts to load
-
-        page.screenshot(path=output_path, full_page=False)
+    # Waits for fonts, images and a settled layout instead of a fixed sleep
+    result = html_to_image(html_path, output_path, viewport={'width': 720, 'height': 720}, full_page=False)
 
-        print(f'Screenshot saved to {output_path}')
-        browser.close()
+    if '--profile' in sys.argv:
+        profiler = Profiler()
+        profiler.add(result)
+        profiler.print_breakdown()
 
 if __name__ == '__main__':
     take_screenshot()
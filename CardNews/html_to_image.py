@@ -2,62 +2,162 @@
 """
 HTML to Image Converter using Playwright
 
+Unchanged cards are served from the render cache (render_cache.py) without
+launching a browser. Everything else renders through the warm render server
+(render_server.py) when one is running, otherwise a browser is launched for
+this render only.
+
 Usage:
-    python3 html_to_image.py <html_file> <output_image>
+    python3 html_to_image.py <html_file> <output_image> [--viewport WxH] [--scale N] [--viewport-only] [--ready-timeout MS] [--cold] [--no-cache]
+        [--dirty [PREVIOUS_PNG]] [--export SPECS] [--profile] [--profile-jsonl FILE] [--trace FILE] [--metrics] [--record HISTORY_DIR] [--target TARGET_IMAGE]
 
 Example:
     python3 html_to_image.py ./example2/outputs/output.html ./example2/outputs/output_v1.png
+    python3 render_server.py start   # optional: keep browsers warm between renders
+    python3 html_to_image.py card.html outputs/output_v2.png --record .history --target target.png
+    python3 html_to_image.py card.html outputs/output_v3.png --dirty outputs/output_v2.png --target target.png
+    python3 html_to_image.py card.html outputs/card.png --viewport 720x720 --export 2:png,1:png-opt,1:jpeg,1:webp
 """
 
+import argparse
+import asyncio
 import sys
-import os
+import time
 from pathlib import Path
-from playwright.sync_api import sync_playwright
+
+from image_export import Exporter, max_scale, parse_specs, print_report
+from page_ready import DEFAULT_TIMEOUT_MS
+from render_cache import RenderCache, cache_key, cacheable
+from render_profile import Profiler, StageTimer, add_profile_arguments, report
+from render_server import render_via_server
+from renderer import make_job, render_cold
+
+
+def parse_viewport(value: str) -> dict:
+    """Parse a WIDTHxHEIGHT string such as 720x720"""
+    width, _, height = value.lower().partition("x")
+    return {"width": int(width), "height": int(height)}
 
 
-def html_to_image(html_path: str, output_path: str):
-    """Convert HTML file to PNG image using Playwright"""
-    
-    # Convert to absolute paths
-    html_path = Path(html_path).resolve()
-    output_path = Path(output_path).resolve()
-    
+def html_to_image(html_path: str, output_path: str, viewport: dict = None, scale: float = 1,
+                  full_page: bool = True, use_server: bool = True, use_cache: bool = True,
+                  ready_timeout_ms: int = DEFAULT_TIMEOUT_MS, metrics: bool = False, dirty: str = None) -> dict:
+    """Convert HTML file to PNG image using Playwright
+
+    With `dirty` set to the previous render's PNG, only the regions whose
+    elements changed are captured and patched into it (see dirty_regions.py).
+    """
+
+    job = make_job(html_path, output_path, viewport, scale, full_page, ready_timeout_ms, metrics, dirty)
+    timer = StageTimer()
+
     # Ensure HTML file exists
-    if not html_path.exists():
-        print(f"Error: HTML file not found: {html_path}")
+    if not Path(job["html_path"]).exists():
+        print(f"Error: HTML file not found: {job['html_path']}")
         sys.exit(1)
-    
-    # Create output directory if it doesn't exist
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Convert HTML to image
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        
-        # Load HTML file
-        page.goto(f"file://{html_path}")
-        
-        # Wait for page to load
-        page.wait_for_load_state("networkidle")
-        
-        # Take screenshot
-        page.screenshot(path=str(output_path), full_page=True)
-        
-        browser.close()
-    
-    print(f"✓ Screenshot saved to: {output_path}")
+
+    # Unchanged HTML, assets and settings reproduce the same pixels
+    # (dirty mode needs the page itself to snapshot element boxes)
+    cache = RenderCache() if use_cache and dirty is None else None
+    if cache is not None:
+        started = time.perf_counter()
+        with timer.span("cache_lookup"):
+            key = cache_key(job)
+            hit = cache.fetch(key, job["output_path"])
+        if hit:
+            latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            print(f"✓ Screenshot saved to: {job['output_path']} ({latency_ms} ms, cache hit)")
+            return {"output_path": job["output_path"], "latency_ms": latency_ms, "mode": "cache",
+                    "spans": timer.spans}
+
+    # Prefer the warm server, fall back to a cold browser launch
+    result = None
+    if use_server:
+        server_start = time.time()
+        result = render_via_server(job)
+        if result is not None:
+            timer.add("server", server_start, (time.time() - server_start) * 1000)
+    if result is None:
+        result = asyncio.run(render_cold(job))
+    if cache is not None and cacheable(result):
+        with timer.span("cache_store"):
+            cache.store(key, result["output_path"])
+    result["spans"] = timer.spans + result["spans"]
+    ready = result["ready"]
+    print(f"✓ Screenshot saved to: {result['output_path']} ({result['latency_ms']} ms, {result['mode']}; "
+          f"ready on {ready['signal']} after {ready['total_ms']} ms, slowest: {ready['slowest']})")
+    if ready.get("failed_requests"):
+        print(f"  {len(ready['failed_requests'])} requests failed, not cached: {ready['failed_requests'][0]}")
+    if result.get("dirty"):
+        info = result["dirty"]
+        if info["full"]:
+            print(f"  full capture: {info['reason']}")
+        else:
+            print(f"  patched {len(info['rects'])} regions ({info['area_ratio'] * 100:.1f}% of the page) "
+                  f"into {info['previous']}")
+    return result
 
 
 def main():
-    if len(sys.argv) != 3:
-        print(__doc__)
+    parser = argparse.ArgumentParser(description="Convert an HTML file to a PNG screenshot")
+    parser.add_argument("html_file")
+    parser.add_argument("output_image")
+    parser.add_argument("--viewport", type=parse_viewport, help="viewport size, e.g. 720x720")
+    parser.add_argument("--scale", type=float, default=1, help="device scale factor")
+    parser.add_argument("--viewport-only", action="store_true",
+                        help="capture only the viewport instead of the full page")
+    parser.add_argument("--ready-timeout", type=int, default=DEFAULT_TIMEOUT_MS,
+                        help="hard limit in ms for fonts, images and layout to settle")
+    parser.add_argument("--cold", action="store_true", help="skip the render server")
+    parser.add_argument("--no-cache", action="store_true", help="always render, ignoring the render cache")
+    parser.add_argument("--export", type=parse_specs, metavar="SPECS",
+                        help="render once at the largest scale, then write SCALE:FORMAT[:QUALITY] outputs, "
+                             "e.g. 2:png,1:jpeg:85,1:webp (overrides --scale)")
+    add_profile_arguments(parser)
+    parser.add_argument("--dirty", nargs="?", const="", metavar="PREVIOUS_PNG",
+                        help="capture only regions changed since PREVIOUS_PNG and patch them into it; "
+                             "without a value, just record element boxes for the next dirty render")
+    parser.add_argument("--record", metavar="HISTORY_DIR", help="add the render to a render_history.py store")
+    parser.add_argument("--target", help="score the render against this image (with --dirty: changed tiles only)")
+    args = parser.parse_args()
+
+    scale = max_scale(args.export) if args.export else args.scale
+    try:
+        result = html_to_image(args.html_file, args.output_image, args.viewport, scale,
+                               full_page=not args.viewport_only, use_server=not args.cold,
+                               use_cache=not args.no_cache, ready_timeout_ms=args.ready_timeout,
+                               metrics=args.metrics, dirty=args.dirty)
+    except RuntimeError as exc:
+        print(f"Error: {exc}")
         sys.exit(1)
-    
-    html_file = sys.argv[1]
-    output_file = sys.argv[2]
-    
-    html_to_image(html_file, output_file)
+
+    profiler = Profiler()
+    profiler.add(result)
+    report(profiler, args)
+
+    scores = None
+    if args.target and result.get("dirty"):
+        from dirty_regions import score_dirty
+        scores = score_dirty(args.target, result["output_path"], result["dirty"])
+        print(f"✓ Score {scores['score']:.4f} ({scores['rescored_tiles']} tiles re-scored)")
+    elif args.target:
+        from pixels import load_rgba, load_rgba_cached
+        from similarity import compare
+        scores = compare(load_rgba_cached(args.target), load_rgba(result["output_path"]))
+        print(f"✓ Score {scores['score']:.4f} (ssim {scores['ssim']:.4f}, diff {scores['pixel_diff']:.4f})")
+
+    if args.export:
+        exporter = Exporter(args.export)
+        exporter.submit(result["output_path"], scale)
+        print_report(exporter.results())
+
+    if args.record:
+        from render_history import RenderHistory
+
+        version = RenderHistory(args.record).add(args.html_file, result["output_path"], timings=result,
+                                                 scores=scores)
+        score = f", score {scores['score']:.4f}" if scores else ""
+        print(f"✓ Recorded v{version} in {args.record}{score}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Render-once multi-scale, multi-format export
+
+A card is rendered once at the highest requested device scale factor. Every
+other size and encoding (PNG, optimized PNG, JPEG, WebP) is produced from
+that screenshot in Python on a thread pool, so encoding overlaps with the
+next render in a batch. Pillow releases the GIL while resizing and encoding.
+
+Export specs are SCALE:FORMAT[:QUALITY], e.g. `2:png,1:png-opt,1:jpeg:85,1:webp`.
+Outputs are written next to the rendered image as `<name>@<scale>x.<ext>`.
+
+Used through html_to_image.py --export and batch_render.py --export.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+FORMATS = {
+    # name: (Pillow format, extension, default quality)
+    "png": ("PNG", "png", None),
+    "png-opt": ("PNG", "png", None),
+    "jpeg": ("JPEG", "jpg", 90),
+    "webp": ("WEBP", "webp", 90),
+}
+
+
+def parse_specs(value: str) -> list:
+    """Parse `2:png,1:jpeg:85` into [(2.0, "png", None), (1.0, "jpeg", 85)]"""
+    specs = []
+    for item in value.split(","):
+        parts = item.strip().lower().split(":")
+        scale = float(parts[0].rstrip("x"))
+        fmt = parts[1] if len(parts) > 1 else "png"
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown export format: {fmt} (choose from {', '.join(FORMATS)})")
+        quality = int(parts[2]) if len(parts) > 2 else FORMATS[fmt][2]
+        specs.append((scale, fmt, quality))
+    return specs
+
+
+def max_scale(specs: list) -> float:
+    """Device scale factor to render at so every spec can be derived from one screenshot"""
+    return max(scale for scale, _, _ in specs)
+
+
+def output_path_for(rendered_path: str, scale: float, fmt: str) -> Path:
+    rendered_path = Path(rendered_path)
+    suffix = "-opt" if fmt == "png-opt" else ""
+    return rendered_path.with_name(f"{rendered_path.stem}@{scale:g}x{suffix}.{FORMATS[fmt][1]}")
+
+
+def encode(image: Image.Image, rendered_scale: float, scale: float, fmt: str, quality, path: Path) -> dict:
+    """Resize the rendered image to `scale` and encode it; returns a report row"""
+    started = time.perf_counter()
+    if scale != rendered_scale:
+        size = (round(image.width * scale / rendered_scale), round(image.height * scale / rendered_scale))
+        image = image.resize(size, Image.LANCZOS)
+    pil_format = FORMATS[fmt][0]
+    options = {}
+    if fmt == "png":
+        options = {"compress_level": 6}
+    elif fmt == "png-opt":
+        options = {"optimize": True}
+    elif fmt == "jpeg":
+        image = image.convert("RGB")
+        options = {"quality": quality, "optimize": True, "progressive": True}
+    elif fmt == "webp":
+        options = {"quality": quality, "method": 4}
+    image.save(path, pil_format, **options)
+    return {
+        "path": str(path),
+        "scale": scale,
+        "format": fmt,
+        "size": list(image.size),
+        "bytes": path.stat().st_size,
+        "encode_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+class Exporter:
+    """Thread pool that turns rendered screenshots into every requested output"""
+
+    def __init__(self, specs: list, workers: int = 4):
+        self.specs = specs
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export")
+        self.pending = []
+
+    def _fan_out(self, rendered_path: str, rendered_scale: float) -> list:
+        # Decode once, then encode every spec in parallel. Pillow keeps save
+        # options on the image object, so each spec needs its own copy.
+        with Image.open(rendered_path) as img:
+            image = img.copy()
+        return [
+            self.pool.submit(encode, image.copy(), rendered_scale, scale, fmt, quality,
+                             output_path_for(rendered_path, scale, fmt))
+            for scale, fmt, quality in self.specs
+        ]
+
+    def submit(self, rendered_path: str, rendered_scale: float = None):
+        """Queue all outputs for one rendered screenshot without blocking the caller"""
+        rendered_scale = rendered_scale or max_scale(self.specs)
+        self.pending.append(self.pool.submit(self._fan_out, rendered_path, rendered_scale))
+
+    def results(self) -> list:
+        """Wait for every queued output and return the report rows"""
+        rows = [future.result() for fan_out in self.pending for future in fan_out.result()]
+        self.pool.shutdown()
+        return rows
+
+
+def print_report(rows: list):
+    """Per-output byte size and encode time"""
+    for row in rows:
+        print(f"  {row['path']}  {row['size'][0]}x{row['size'][1]}  "
+              f"{row['bytes'] / 1024:8.1f} KB  {row['encode_ms']:7.1f} ms")
+    total = sum(row["bytes"] for row in rows)
+    print(f"✓ {len(rows)} exports, {total / 1024:.1f} KB total")
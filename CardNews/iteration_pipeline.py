@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Overlapped render -> analyze -> score pipeline for iteration runs
+
+Renders every card version, analyzes each screenshot (edge density grids and
+dominant colours) and scores it against the target image in one command.
+Rendering runs on asyncio pages in a single browser; analysis and scoring run
+on a process pool. Stages are joined by bounded queues, so card v3 can render
+while v2 is analyzed and v1 is scored, and a slow stage holds back the ones
+before it instead of piling up screenshots.
+
+Unchanged cards are served from the render cache like html_to_image.py. Each
+card's spans (render stages, queue waits, analyze, score) go through the same
+profiling flags as the render CLIs.
+
+Usage:
+    python3 iteration_pipeline.py "<html glob>" --target <target_image> [--out-dir DIR] [--viewport WxH]
+        [--scale N] [--viewport-only] [--renderers N] [--workers N] [--queue-size N] [--tiles 8]
+        [--grid RxC ...] [--colors 5] [--no-cache] [--json FILE] [--profile] [--trace FILE]
+
+Example:
+    python3 iteration_pipeline.py "example2/card_v*.html" --target example2/target.png \\
+        --out-dir example2/outputs --viewport 720x720 --viewport-only
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from batch_render import jobs_from_glob
+from edge_density import parse_grid
+from html_to_image import parse_viewport
+from render_cache import RenderCache, cache_key, cacheable
+from render_profile import Profiler, StageTimer, add_profile_arguments, percentile, report
+from renderer import new_context, render_on_page
+
+STAGES = ("render", "analyze", "score")
+
+
+def analyze_output(output_path: str, grids: list, colors: int) -> dict:
+    """Edge density grids and dominant colours of a rendered card; runs in a worker process"""
+    from edge_density import edge_grids
+    from palette import region_palettes
+    from pixels import load_rgba
+
+    image = load_rgba(output_path)
+    h, w = image.shape[:2]
+    densities = edge_grids(image, grids)
+    return {
+        "edge_density": {f"{rows}x{cols}": round(float(density.mean()), 4)
+                         for (rows, cols), density in densities.items()},
+        "palette": region_palettes(image, [(0, h, 0, w)], k=colors)[0]["all"]["palette"],
+    }
+
+
+def score_output(target_path: str, output_path: str, tiles: int) -> dict:
+    """Similarity of a rendered card to the target; runs in a worker process"""
+    from pixels import load_rgba, load_rgba_cached
+    from similarity import compare
+
+    # The target is decoded once and shared by every worker through the page cache
+    return compare(load_rgba_cached(target_path), load_rgba(output_path), tiles)
+
+
+async def close_quietly(target):
+    """Close a page or context that may already be gone"""
+    if target is None or (hasattr(target, "is_closed") and target.is_closed()):
+        return
+    try:
+        await target.close()
+    except Exception:
+        pass
+
+
+class Stage:
+    """Bookkeeping for one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.busy_ms = []
+        self.wait_ms = []
+        self.blocked_ms = []
+
+    def summary(self) -> dict:
+        return {
+            "stage": self.name,
+            "items": len(self.busy_ms),
+            "busy_mean_ms": round(sum(self.busy_ms) / len(self.busy_ms), 1) if self.busy_ms else 0.0,
+            "wait_mean_ms": round(sum(self.wait_ms) / len(self.wait_ms), 1) if self.wait_ms else 0.0,
+            "wait_p95_ms": round(percentile(self.wait_ms, 95), 1),
+            "blocked_mean_ms": round(sum(self.blocked_ms) / len(self.blocked_ms), 1) if self.blocked_ms else 0.0,
+        }
+
+
+async def run_pipeline(jobs: list, target_path: str, renderers: int = 2, workers: int = None,
+                       queue_size: int = 2, tiles: int = 8, grids: list = ((20, 20),), colors: int = 5,
+                       use_cache: bool = True) -> tuple:
+    """Render, analyze and score every job with the stages overlapped
+
+    Returns (results, stage summaries). Each result carries the render
+    result fields plus `analysis`, `score` and per-card `spans`.
+    """
+    from playwright.async_api import async_playwright
+
+    loop = asyncio.get_running_loop()
+    stages = {name: Stage(name) for name in STAGES}
+    queues = {name: asyncio.Queue(maxsize=queue_size) for name in STAGES}
+    workers = workers or os.cpu_count()
+    cache = RenderCache() if use_cache else None
+    contexts = {}
+    context_lock = asyncio.Lock()
+    results = []
+
+    async def put(stage: Stage, queue: asyncio.Queue, item: dict):
+        # Time spent blocked here is backpressure from the next stage
+        item["queued"] = time.time()
+        await queue.put(item)
+        stage.blocked_ms.append((time.time() - item["queued"]) * 1000)
+
+    async def get(stage: Stage, queue: asyncio.Queue):
+        item = await queue.get()
+        if item is not None:
+            wait_ms = (time.time() - item["queued"]) * 1000
+            stage.wait_ms.append(wait_ms)
+            item["timer"].add(f"queue.{stage.name}", item["queued"], wait_ms)
+        return item
+
+    async def feed():
+        for job in jobs:
+            await put(stages["render"], queues["render"], {"job": job, "timer": StageTimer()})
+        for _ in range(renderers):
+            await queues["render"].put(None)
+
+    async def fresh_page():
+        # A crashed page can take its context down; start a new one while the browser lives
+        async with context_lock:
+            try:
+                return await contexts["current"].new_page()
+            except Exception:
+                if not browser.is_connected():
+                    raise
+                await close_quietly(contexts["current"])
+                contexts["current"] = await new_context(browser, jobs[0]["scale"])
+                return await contexts["current"].new_page()
+
+    async def render_worker():
+        page = None
+        try:
+            while (item := await get(stages["render"], queues["render"])) is not None:
+                job, timer = item["job"], item["timer"]
+                started = time.time()
+                try:
+                    key = hit = None
+                    if cache is not None:
+                        with timer.span("cache_lookup"):
+                            key = cache_key(job)
+                            hit = cache.fetch(key, job["output_path"])
+                    if hit:
+                        result = {"output_path": job["output_path"], "mode": "cache"}
+                    else:
+                        page = page or await fresh_page()
+                        result = await render_on_page(page, job)
+                        timer.spans.extend(result.pop("spans"))
+                        result["mode"] = "warm"
+                        if cache is not None and cacheable(result):
+                            with timer.span("cache_store"):
+                                cache.store(key, job["output_path"])
+                except Exception as exc:
+                    # Don't reuse a page that may have crashed or closed
+                    await close_quietly(page)
+                    page = None
+                    print(f"✗ {job['html_path']}: {exc}")
+                    results.append({"html_path": job["html_path"], "output_path": job["output_path"],
+                                    "ok": False, "error": str(exc), "spans": timer.spans})
+                    continue
+                finally:
+                    stages["render"].busy_ms.append((time.time() - started) * 1000)
+                item["result"] = {**result, "html_path": job["html_path"],
+                                  "render_ms": round((time.time() - started) * 1000, 1)}
+                await put(stages["analyze"], queues["analyze"], item)
+        finally:
+            await close_quietly(page)
+
+    async def pool_worker(name: str, fn, next_stage: str = None):
+        while (item := await get(stages[name], queues[name])) is not None:
+            result, timer = item["result"], item["timer"]
+            started = time.time()
+            try:
+                if name == "analyze":
+                    result["analysis"] = await loop.run_in_executor(pool, fn, result["output_path"], grids, colors)
+                else:
+                    result["score"] = await loop.run_in_executor(pool, fn, target_path, result["output_path"], tiles)
+            except Exception as exc:
+                result.update({"ok": False, "error": f"{name}: {exc}"})
+                print(f"✗ {result['html_path']}: {name} failed: {exc}")
+            finally:
+                dur_ms = (time.time() - started) * 1000
+                stages[name].busy_ms.append(dur_ms)
+                timer.add(name, started, dur_ms)
+
+            if next_stage is not None and result.get("ok", True):
+                await put(stages[next_stage], queues[next_stage], item)
+                continue
+            result.setdefault("ok", True)
+            result["spans"] = timer.spans
+            results.append(result)
+            if result["ok"]:
+                score = result["score"]
+                print(f"✓ {Path(result['html_path']).name} -> {result['output_path']}  score {score['score']:.4f} "
+                      f"(ssim {score['ssim']:.4f}, diff {score['pixel_diff']:.4f})")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch()
+            contexts["current"] = await new_context(browser, jobs[0]["scale"])
+            analyzers = [asyncio.create_task(pool_worker("analyze", analyze_output, "score"))
+                         for _ in range(workers)]
+            scorers = [asyncio.create_task(pool_worker("score", score_output)) for _ in range(workers)]
+
+            await asyncio.gather(feed(), *(render_worker() for _ in range(renderers)))
+            for _ in analyzers:
+                await queues["analyze"].put(None)
+            await asyncio.gather(*analyzers)
+            for _ in scorers:
+                await queues["score"].put(None)
+            await asyncio.gather(*scorers)
+            await browser.close()
+
+    return results, [stage.summary() for stage in stages.values()]
+
+
+def print_stages(rows: list):
+    """Per-stage busy time, queue wait before the stage and backpressure on it"""
+    print(f"\n{'stage':<10}{'items':>6}{'busy ms':>10}{'wait ms':>10}{'wait p95':>10}{'blocked ms':>12}")
+    for row in rows:
+        print(f"{row['stage']:<10}{row['items']:>6}{row['busy_mean_ms']:>10.1f}{row['wait_mean_ms']:>10.1f}"
+              f"{row['wait_p95_ms']:>10.1f}{row['blocked_mean_ms']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render, analyze and score card versions with overlapped stages")
+    parser.add_argument("glob", help="glob pattern of card HTML files")
+    parser.add_argument("--target", required=True, help="target image to score against")
+    parser.add_argument("--out-dir", help="output directory (default: next to each HTML)")
+    parser.add_argument("--viewport", type=parse_viewport, help="viewport size, e.g. 720x720")
+    parser.add_argument("--scale", type=float, default=1, help="device scale factor")
+    parser.add_argument("--viewport-only", action="store_true", help="capture only the viewport")
+    parser.add_argument("--renderers", type=int, default=2, help="concurrent browser pages")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="analysis/scoring processes")
+    parser.add_argument("--queue-size", type=int, default=2, help="items buffered between stages")
+    parser.add_argument("--tiles", type=int, default=8, help="score grid size")
+    parser.add_argument("--grid", type=parse_grid, action="append",
+                        help="edge grid size ROWSxCOLS, repeatable (default: 20x20)")
+    parser.add_argument("--colors", type=int, default=5, help="dominant colours per card")
+    parser.add_argument("--no-cache", action="store_true", help="always render, ignoring the render cache")
+    parser.add_argument("--json", metavar="FILE", help="write per-card results and stage summaries as JSON")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if not Path(args.target).exists():
+        print(f"Error: target image not found: {args.target}")
+        sys.exit(1)
+    jobs = jobs_from_glob(args.glob, args.out_dir, args.viewport, args.scale, not args.viewport_only)
+    if not jobs:
+        print("Error: no HTML files to render")
+        sys.exit(1)
+    for job in jobs:
+        job["metrics"] = args.metrics
+        Path(job["output_path"]).parent.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    results, stages = asyncio.run(run_pipeline(
+        jobs, args.target, args.renderers, args.workers, args.queue_size, args.tiles,
+        args.grid or [(20, 20)], args.colors, not args.no_cache,
+    ))
+    elapsed = time.perf_counter() - started
+
+    profiler = Profiler()
+    for result in results:
+        profiler.add(result)
+    report(profiler, args)
+    print_stages(stages)
+
+    ok = [r for r in results if r["ok"]]
+    if args.json:
+        Path(args.json).write_text(json.dumps({"elapsed_s": round(elapsed, 3), "stages": stages,
+                                               "cards": results}, indent=2))
+        print(f"✓ Results saved to: {args.json}")
+    if ok:
+        best = max(ok, key=lambda r: r["score"]["score"])
+        print(f"\nBest: {Path(best['html_path']).name} (score {best['score']['score']:.4f})")
+    print(f"{len(ok)}/{len(jobs)} cards in {elapsed:.2f} s ({len(ok) / elapsed:.2f} cards/sec end to end)")
+    if len(ok) < len(jobs):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Text band analyzer for reference promo images
+
+NumPy port of the analysis in example1/analyze.html: diff the reference image
+against its background, count differing pixels per row, group busy rows into
+text bands and report each band's horizontal extent and mean colour. The JSON
+printed here has the same shape as the JS `analyze()` result, without a
+browser or a base64 round-trip.
+
+Usage:
+    python3 layout_analysis.py <reference_image> <background_image> [--size WxH|native]
+        [--diff-threshold 40] [--noise 5] [--min-band 8] [--palette K]
+
+Example:
+    python3 layout_analysis.py example1/references/image.png example1/references/background.jpg
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from pixels import load_rgba
+
+# Canvas size hardcoded in example1/generate_analyze.py
+DEFAULT_SIZE = (847, 595)
+
+
+def diff_mask(reference: np.ndarray, background: np.ndarray, diff_threshold: int = 40) -> np.ndarray:
+    """Pixels whose summed |R|+|G|+|B| difference from the background exceeds the threshold"""
+    ref = reference[..., :3]
+    bg = background[..., :3]
+    # |a - b| in uint8 without widening the whole image first
+    diff = np.maximum(ref, bg)
+    diff -= np.minimum(ref, bg)
+    total = diff[..., 0].astype(np.uint16)
+    total += diff[..., 1]
+    total += diff[..., 2]
+    return total > diff_threshold
+
+
+def find_bands(row_counts: np.ndarray, noise: int = 5, min_band: int = 8) -> list:
+    """(top, height) of runs of rows with more than `noise` differing pixels"""
+    active = np.concatenate(([False], row_counts > noise))
+    edges = np.diff(active.astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    # Like the JS loop, a band still open at the bottom edge is never closed
+    return [(int(top), int(end - top)) for top, end in zip(starts, ends) if end - top > min_band]
+
+
+def _round(value: float) -> int:
+    # JS Math.round: halves round up
+    return int(np.floor(value + 0.5))
+
+
+def text_bands(reference: np.ndarray, background: np.ndarray, diff_threshold: int = 40,
+               noise: int = 5, min_band: int = 8, mask: np.ndarray = None) -> list:
+    """Text bands of a reference image, as returned by the JS analyze()
+
+    Pass a precomputed diff_mask() as `mask` to avoid diffing the images again.
+    """
+    if mask is None:
+        mask = diff_mask(reference, background, diff_threshold)
+    w = mask.shape[1]
+    row_counts = mask.sum(axis=1)
+
+    # Per-row extents, so each band reduces over rows only
+    row_min = np.argmax(mask, axis=1)
+    row_max = w - 1 - np.argmax(mask[:, ::-1], axis=1)
+
+    results = []
+    for top, height in find_bands(row_counts, noise, min_band):
+        bottom = top + height
+        left = int(row_min[top:bottom].min())
+        right = int(row_max[top:bottom].max())
+        pixels = reference[top:bottom, :, :3][mask[top:bottom]]
+        count = len(pixels)
+        rgb = pixels.sum(axis=0, dtype=np.int64) / count if count else None
+        results.append({
+            "top": top,
+            "height": height,
+            "left": left,
+            "right": right,
+            "width": right - left,
+            "color": f"rgb({_round(rgb[0])}, {_round(rgb[1])}, {_round(rgb[2])})" if count else "unknown",
+        })
+    return results
+
+
+def analyze(reference_path: str, background_path: str, size: tuple = DEFAULT_SIZE, palette: int = None,
+            diff_threshold: int = 40, **thresholds) -> list:
+    """Load both images at the analysis size and return their text bands
+
+    With `palette` set to k, each band also gets its top-k colours, computed
+    from the same decoded images and diff mask.
+    """
+    if size is None:
+        reference = load_rgba(reference_path)
+        size = (reference.shape[1], reference.shape[0])
+    else:
+        reference = load_rgba(reference_path, size)
+    background = load_rgba(background_path, size)
+    mask = diff_mask(reference, background, diff_threshold)
+    bands = text_bands(reference, background, diff_threshold, mask=mask, **thresholds)
+    if palette:
+        add_palettes(bands, reference, mask, palette)
+    return bands
+
+
+def add_palettes(bands: list, reference: np.ndarray, mask: np.ndarray, k: int = 5) -> list:
+    """Attach a `palette` entry with foreground/background dominant colours to each band"""
+    from palette import band_regions, region_palettes
+
+    for band, palettes in zip(bands, region_palettes(reference, band_regions(bands), mask, k)):
+        band["palette"] = palettes
+    return bands
+
+
+def parse_size(value: str):
+    """Parse WIDTHxHEIGHT, or `native` to keep the reference image size"""
+    if value == "native":
+        return None
+    width, _, height = value.lower().partition("x")
+    return (int(width), int(height))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find text bands in a reference promo image")
+    parser.add_argument("reference")
+    parser.add_argument("background")
+    parser.add_argument("--size", type=parse_size, default=DEFAULT_SIZE,
+                        help="analysis size WxH, or `native` (default: 847x595 like analyze.html)")
+    parser.add_argument("--diff-threshold", type=int, default=40, help="summed RGB difference for content")
+    parser.add_argument("--noise", type=int, default=5, help="differing pixels a row needs to count")
+    parser.add_argument("--min-band", type=int, default=8, help="bands must be taller than this")
+    parser.add_argument("--palette", type=int, metavar="K",
+                        help="add each band's top-K foreground/background colours (see palette.py)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = analyze(args.reference, args.background, args.size, args.palette,
+                      diff_threshold=args.diff_threshold, noise=args.noise, min_band=args.min_band)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print(json.dumps(results, indent=2))
+    print(f"✓ {len(results)} bands in {elapsed_ms:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Deterministic page readiness and offline asset cache for renders
+
+Instead of `networkidle` or a flat sleep, a page counts as ready once
+`document.fonts.ready` has resolved, every <img> has decoded and the layout
+has stayed the same for two animation frames, whichever takes longest, with
+a hard timeout on top. The result says which signal fired last and when.
+
+Remote requests (web fonts, Google Fonts CSS, CDN images) go through
+Playwright request interception and are answered from an on-disk cache, so
+after the first render a card needs no network at all.
+
+Usage:
+    python3 page_ready.py stats
+    python3 page_ready.py clear
+
+Environment:
+    CARDNEWS_ASSET_CACHE  asset cache directory (default: ~/.cache/cardnews/assets)
+    CARDNEWS_OFFLINE=1    never touch the network; uncached remote requests fail
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+
+DEFAULT_TIMEOUT_MS = 5000
+DEFAULT_ASSET_DIR = Path(os.environ.get(
+    "CARDNEWS_ASSET_CACHE",
+    Path.home() / ".cache" / "cardnews" / "assets",
+))
+OFFLINE = os.environ.get("CARDNEWS_OFFLINE") == "1"
+
+READY_SCRIPT = """
+async (timeoutMs) => {
+    const start = performance.now();
+    const timings = {};
+    const mark = (name) => { timings[name] = Math.round((performance.now() - start) * 10) / 10; };
+    const nextFrame = () => new Promise(resolve => requestAnimationFrame(() => resolve()));
+
+    const ready = (async () => {
+        await document.fonts.ready;
+        mark('fonts');
+
+        await Promise.all(Array.from(document.images).map(img => img.decode().catch(() => {})));
+        mark('images');
+
+        // Layout is settled when its size is unchanged for two consecutive frames
+        let last = null;
+        let stable = 0;
+        while (stable < 2) {
+            await nextFrame();
+            const root = document.documentElement;
+            const rect = root.getBoundingClientRect();
+            const signature = [root.scrollWidth, root.scrollHeight, rect.width, rect.height].join();
+            stable = signature === last ? stable + 1 : 0;
+            last = signature;
+        }
+        mark('layout');
+        return 'layout';
+    })();
+
+    const timeout = new Promise(resolve => setTimeout(() => resolve('timeout'), timeoutMs));
+    const signal = await Promise.race([ready, timeout]);
+    return {signal, timings, total_ms: Math.round((performance.now() - start) * 10) / 10};
+}
+"""
+
+
+def _summarize(raw: dict) -> dict:
+    timings = raw["timings"]
+    # The slowest stage is the one that held the render back
+    previous = 0.0
+    slowest, slowest_ms = None, -1.0
+    for stage in ("fonts", "images", "layout"):
+        if stage in timings:
+            if timings[stage] - previous > slowest_ms:
+                slowest, slowest_ms = stage, timings[stage] - previous
+            previous = timings[stage]
+    return {
+        "signal": raw["signal"],
+        "slowest": slowest,
+        "timings_ms": timings,
+        "total_ms": raw["total_ms"],
+    }
+
+
+async def wait_until_ready(page, timeout_ms: int = DEFAULT_TIMEOUT_MS) -> dict:
+    """Wait for fonts, image decode and a settled layout; returns which signal fired and when"""
+    return _summarize(await page.evaluate(READY_SCRIPT, timeout_ms))
+
+
+class AssetCache:
+    """On-disk cache of remote responses, keyed by URL"""
+
+    def __init__(self, directory: Path = DEFAULT_ASSET_DIR, offline: bool = OFFLINE):
+        self.directory = Path(directory)
+        self.offline = offline
+
+    def _paths(self, url: str) -> tuple:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / f"{key}.body", self.directory / f"{key}.json"
+
+    def get(self, url: str):
+        body, meta = self._paths(url)
+        if not (body.exists() and meta.exists()):
+            return None
+        return json.loads(meta.read_text()), body
+
+    def put(self, url: str, status: int, headers: dict, content: bytes):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        body, meta = self._paths(url)
+        # Body first: get() treats an entry as present once its meta exists
+        for path, data in ((body, content), (meta, json.dumps({
+            "url": url,
+            "status": status,
+            "content_type": headers.get("content-type", "application/octet-stream"),
+        }).encode())):
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+
+    async def handle(self, route):
+        """Playwright route handler: answer GETs from disk, fetch and store on a miss"""
+        url = route.request.url
+        if route.request.method != "GET":
+            # Responses to other methods depend on the request body; never cache them
+            if self.offline:
+                await route.abort("internetdisconnected")
+            else:
+                await route.continue_()
+            return
+        cached = self.get(url)
+        if cached is not None:
+            meta, body = cached
+            await route.fulfill(
+                status=meta["status"],
+                content_type=meta["content_type"],
+                headers={"access-control-allow-origin": "*"},
+                path=str(body),
+            )
+            return
+        if self.offline:
+            await route.abort("internetdisconnected")
+            return
+
+        try:
+            response = await route.fetch()
+            content = await response.body()
+        except Exception:
+            # No network: fail the request so the page falls back instead of hanging
+            await route.abort("failed")
+            return
+        if response.ok:
+            self.put(url, response.status, response.headers, content)
+        await route.fulfill(response=response, body=content)
+
+    async def install(self, context):
+        """Route every http(s) request of a browser context through the cache"""
+        await context.route(re.compile(r"^https?://"), self.handle)
+
+    def stats(self) -> dict:
+        metas = list(self.directory.glob("*.json")) if self.directory.exists() else []
+        size = sum(p.stat().st_size for p in self.directory.glob("*.body")) if metas else 0
+        return {
+            "entries": len(metas),
+            "size_mb": round(size / 1024 / 1024, 2),
+            "directory": str(self.directory),
+            "offline": self.offline,
+        }
+
+    def clear(self) -> int:
+        removed = self.stats()["entries"]
+        if self.directory.exists():
+            shutil.rmtree(self.directory)
+        return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the offline asset cache")
+    parser.add_argument("command", choices=["stats", "clear"])
+    args = parser.parse_args()
+
+    cache = AssetCache()
+    if args.command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    else:
+        print(f"✓ Removed {cache.clear()} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Image loading helpers shared by the NumPy analysis modules.
+
+`load_rgba_cached` keeps decoded pixels as .npy files keyed by the image's
+content hash and maps them back with np.memmap. Re-running an analysis with
+different thresholds skips PNG/JPEG decoding, and processes reading the same
+image share the page cache instead of each holding a private copy. Decodes
+are uncompressed (~8 MB per 1440x1440 image), so entries are evicted
+least-recently-used once the cache grows past its size cap.
+
+Usage:
+    python3 pixels.py stats
+    python3 pixels.py prune [--max-mb N]
+    python3 pixels.py clear
+
+Environment:
+    CARDNEWS_PIXEL_CACHE         decoded pixel cache directory (default: ~/.cache/cardnews/pixels)
+    CARDNEWS_PIXEL_CACHE_MAX_MB  size cap in MB (default: 2000)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_CACHE_DIR = Path(os.environ.get(
+    "CARDNEWS_PIXEL_CACHE",
+    Path.home() / ".cache" / "cardnews" / "pixels",
+))
+DEFAULT_MAX_MB = float(os.environ.get("CARDNEWS_PIXEL_CACHE_MAX_MB", 2000))
+CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path: Path) -> str:
+    """sha256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_rgba(path: str, size: tuple = None) -> np.ndarray:
+    """Decode an image into an (height, width, 4) uint8 RGBA array
+
+    When `size` is given as (width, height) the image is resampled bilinearly,
+    the way a browser canvas `drawImage(img, 0, 0, w, h)` scales it.
+    """
+    with Image.open(path) as img:
+        img = img.convert("RGBA")
+        if size is not None and img.size != tuple(size):
+            img = img.resize(tuple(size), Image.BILINEAR)
+        return np.asarray(img)
+
+
+class PixelCache:
+    """Decoded RGBA arrays as .npy files, with LRU eviction by access time"""
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, max_mb: float = DEFAULT_MAX_MB):
+        self.directory = Path(directory)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+    def entries(self) -> list:
+        """Cache entries as (path, size, last_used), most recently used first"""
+        if not self.directory.exists():
+            return []
+        entries = []
+        for path in self.directory.glob("*.npy"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # evicted by another process
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2], reverse=True)
+
+    def load(self, path: str, size: tuple = None, digest: str = None) -> np.ndarray:
+        """Read-only memory map of the decoded image, decoding it on a miss"""
+        digest = digest or file_digest(Path(path))
+        suffix = f"_{size[0]}x{size[1]}" if size is not None else ""
+        cached = self.directory / f"{digest}{suffix}.npy"
+        try:
+            pixels = np.load(cached, mmap_mode="r")
+            os.utime(cached)  # mark as recently used
+            return pixels
+        except FileNotFoundError:
+            pass
+        pixels = load_rgba(path, size)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, pixels)
+        os.replace(tmp, cached)
+        self.prune()
+        return np.load(cached, mmap_mode="r")
+
+    def prune(self, max_bytes: int = None) -> int:
+        """Evict least recently used entries until the cache fits; returns entries removed"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        total = 0
+        removed = 0
+        for path, size, _ in self.entries():
+            total += size
+            if total > max_bytes:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        entries = self.entries()
+        return {
+            "entries": len(entries),
+            "size_mb": round(sum(size for _, size, _ in entries) / 1024 / 1024, 2),
+            "max_mb": round(self.max_bytes / 1024 / 1024, 2),
+            "directory": str(self.directory),
+        }
+
+    def clear(self) -> int:
+        removed = len(self.entries())
+        if self.directory.exists():
+            shutil.rmtree(self.directory)
+        return removed
+
+
+def load_rgba_cached(path: str, size: tuple = None, cache_dir: Path = DEFAULT_CACHE_DIR,
+                     digest: str = None) -> np.ndarray:
+    """Like load_rgba, but returns a read-only memory map of a cached decode"""
+    return PixelCache(cache_dir).load(path, size, digest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or prune the decoded pixel cache")
+    parser.add_argument("command", choices=["stats", "prune", "clear"])
+    parser.add_argument("--max-mb", type=float, help="size cap for prune (default: configured cap)")
+    args = parser.parse_args()
+
+    cache = PixelCache()
+    if args.command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    elif args.command == "prune":
+        max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+        print(f"✓ Removed {cache.prune(max_bytes)} entries")
+    else:
+        print(f"✓ Removed {cache.clear()} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Content-addressed render cache for html_to_image.py
+
+The cache key covers everything that can change the pixels: the HTML bytes,
+every local asset it references (images, fonts, CSS, followed recursively
+through stylesheets), the viewport, the device scale factor, the capture mode
+and the installed Chromium version. A matching key returns the cached PNG
+without launching a browser. Entries are evicted least-recently-used once the
+cache grows past its size cap.
+
+Usage:
+    python3 render_cache.py stats
+    python3 render_cache.py list
+    python3 render_cache.py prune [--max-mb N]
+    python3 render_cache.py clear
+
+Environment:
+    CARDNEWS_RENDER_CACHE         cache directory (default: ~/.cache/cardnews/renders)
+    CARDNEWS_RENDER_CACHE_MAX_MB  size cap in MB (default: 500)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+DEFAULT_DIR = Path(os.environ.get(
+    "CARDNEWS_RENDER_CACHE",
+    Path.home() / ".cache" / "cardnews" / "renders",
+))
+DEFAULT_MAX_MB = float(os.environ.get("CARDNEWS_RENDER_CACHE_MAX_MB", 500))
+
+# src="...", href="...", url(...) and @import "..." references
+ASSET_PATTERN = re.compile(
+    r"""(?:src|href)\s*=\s*["']([^"']+)["']"""
+    r"""|url\(\s*["']?([^"')]+)["']?\s*\)"""
+    r"""|@import\s+["']([^"']+)["']""",
+    re.IGNORECASE,
+)
+
+
+def browser_version() -> str:
+    """Installed Playwright and Chromium versions, read without launching a browser"""
+    try:
+        from importlib.metadata import version
+        import playwright
+    except ImportError:
+        return "unknown"
+
+    browsers = Path(playwright.__file__).parent / "driver" / "package" / "browsers.json"
+    chromium = "unknown"
+    if browsers.exists():
+        for entry in json.loads(browsers.read_text())["browsers"]:
+            if entry["name"] == "chromium":
+                chromium = f"{entry.get('browserVersion')}@{entry['revision']}"
+    return f"playwright-{version('playwright')}/chromium-{chromium}"
+
+
+def local_assets(path: Path, seen: set = None) -> set:
+    """Local files referenced by an HTML or CSS file, followed through stylesheets"""
+    seen = set() if seen is None else seen
+    try:
+        text = path.read_text(errors="ignore")
+    except OSError:
+        return seen
+
+    for match in ASSET_PATTERN.finditer(text):
+        ref = next(group for group in match.groups() if group)
+        parts = urlsplit(ref)
+        if parts.scheme not in ("", "file") or parts.netloc or not parts.path:
+            continue  # remote, data: or fragment URL, already covered by the HTML bytes
+        asset = (path.parent / unquote(parts.path)).resolve()
+        if asset in seen:
+            continue
+        seen.add(asset)
+        if asset.suffix.lower() == ".css":
+            local_assets(asset, seen)
+    return seen
+
+
+def _hash_file(digest, path: Path):
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    except OSError:
+        digest.update(b"<missing>")
+
+
+def cache_key(job: dict) -> str:
+    """Cache key for a render job"""
+    html_path = Path(job["html_path"])
+    digest = hashlib.sha256()
+    digest.update(json.dumps({
+        "viewport": job["viewport"],
+        "scale": job["scale"],
+        "full_page": job["full_page"],
+        "browser": browser_version(),
+    }, sort_keys=True).encode())
+    _hash_file(digest, html_path)
+    for asset in sorted(local_assets(html_path)):
+        digest.update(str(asset).encode())
+        _hash_file(digest, asset)
+    return digest.hexdigest()
+
+
+def cacheable(result: dict) -> bool:
+    """Only renders that settled with every request answered are safe to reuse
+
+    A readiness timeout or a failed request (an aborted web font, say) leaves
+    fallback pixels that the cache key, which only covers local files, can't see.
+    """
+    ready = result.get("ready") or {}
+    return ready.get("signal") == "layout" and not ready.get("failed_requests")
+
+
+class RenderCache:
+    """PNG store keyed by cache_key(), with LRU eviction by access time"""
+
+    def __init__(self, directory: Path = DEFAULT_DIR, max_mb: float = DEFAULT_MAX_MB):
+        self.directory = Path(directory)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.stats_path = self.directory / "stats.json"
+
+    def _entry(self, key: str) -> Path:
+        return self.directory / f"{key}.png"
+
+    def entries(self) -> list:
+        """Cache entries as (path, size, last_used), most recently used first"""
+        if not self.directory.exists():
+            return []
+        entries = []
+        for path in self.directory.glob("*.png"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # evicted by another process
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2], reverse=True)
+
+    def _counters(self) -> dict:
+        """Hit/miss counters; a missing or unreadable stats file counts as zero"""
+        counters = {"hits": 0, "misses": 0}
+        try:
+            saved = json.loads(self.stats_path.read_text())
+            counters.update({field: int(saved[field]) for field in counters if field in saved})
+        except (OSError, ValueError, TypeError):
+            pass
+        return counters
+
+    def stats(self) -> dict:
+        counters = self._counters()
+        lookups = counters["hits"] + counters["misses"]
+        entries = self.entries()
+        return {
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 3) if lookups else None,
+            "entries": len(entries),
+            "size_mb": round(sum(size for _, size, _ in entries) / 1024 / 1024, 2),
+            "max_mb": round(self.max_bytes / 1024 / 1024, 2),
+            "directory": str(self.directory),
+        }
+
+    def _count(self, field: str):
+        # Concurrent renders may lose an increment, but never leave a torn stats file
+        self.directory.mkdir(parents=True, exist_ok=True)
+        counters = self._counters()
+        counters[field] += 1
+        tmp = self.stats_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(counters))
+        os.replace(tmp, self.stats_path)
+
+    def fetch(self, key: str, output_path: str) -> bool:
+        """Copy the cached PNG to output_path; returns False on a miss"""
+        entry = self._entry(key)
+        if not entry.exists():
+            self._count("misses")
+            return False
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(entry, output_path)
+        os.utime(entry)  # mark as recently used
+        self._count("hits")
+        return True
+
+    def store(self, key: str, image_path: str):
+        """Add a rendered PNG to the cache and evict old entries if over the cap"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self._entry(key).with_suffix(f".{os.getpid()}.tmp")
+        shutil.copyfile(image_path, tmp)
+        os.replace(tmp, self._entry(key))
+        self.prune()
+
+    def prune(self, max_bytes: int = None) -> int:
+        """Evict least recently used entries until the cache fits; returns entries removed"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        total = 0
+        removed = 0
+        for path, size, _ in self.entries():
+            total += size
+            if total > max_bytes:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def clear(self) -> int:
+        removed = len(self.entries())
+        if self.directory.exists():
+            shutil.rmtree(self.directory)
+        return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or prune the html_to_image render cache")
+    parser.add_argument("command", choices=["stats", "list", "prune", "clear"])
+    parser.add_argument("--max-mb", type=float, help="size cap for prune (default: configured cap)")
+    args = parser.parse_args()
+
+    cache = RenderCache()
+    if args.command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    elif args.command == "list":
+        for path, size, last_used in cache.entries():
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_used))
+            print(f"{path.stem[:16]}  {size / 1024:8.1f} KB  {stamp}")
+    elif args.command == "prune":
+        max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+        print(f"✓ Removed {cache.prune(max_bytes)} entries")
+    else:
+        print(f"✓ Removed {cache.clear()} entries")
+
+
+if __name__ == "__main__":
+    main()
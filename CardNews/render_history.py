@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Versioned render history
+
+Keeps every iteration of a card (HTML, screenshot, render timings and
+similarity scores) in one SQLite file instead of a pile of near-identical
+output_v{n}.png copies. Screenshots are cut into 64x64 tiles, each encoded
+as lossless WebP (RGB when fully opaque) and stored once by content hash, so
+a version only costs the tiles that changed since any earlier version. The
+index holds per-version tile hashes and scores, which makes list / best /
+diff instant without decoding any image.
+
+Usage:
+    python3 render_history.py add <html_file> <image> [--target target.png] [--label TEXT] [--store DIR]
+    python3 render_history.py list [--store DIR]
+    python3 render_history.py best [--store DIR]
+    python3 render_history.py diff <v1> <v2> [--store DIR]
+    python3 render_history.py export <version> <output_image> [--html OUTPUT_HTML] [--store DIR]
+
+Example:
+    cd example2
+    python3 ../render_history.py add card_v1.html outputs/output_v1.png --target target.png
+    python3 ../render_history.py diff 1 2
+"""
+
+import argparse
+import difflib
+import hashlib
+import io
+import json
+import sqlite3
+import sys
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from pixels import load_rgba
+
+DEFAULT_STORE = ".history"
+TILE = 64
+
+SCHEMA = """
+PRAGMA page_size = 32768;
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versions (
+    version INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    label TEXT,
+    html_path TEXT,
+    html_hash TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    tile INTEGER NOT NULL,
+    tiles TEXT NOT NULL,
+    timings TEXT,
+    score REAL,
+    scores TEXT
+);
+"""
+
+
+def _is_webp(data: bytes) -> bool:
+    # zlib streams start with 0x78, so this never matches a deflated blob
+    return data[:4] == b"RIFF" and data[8:12] == b"WEBP"
+
+
+def _tile_grid(height: int, width: int, tile: int = TILE) -> list:
+    return [(y, x) for y in range(0, height, tile) for x in range(0, width, tile)]
+
+
+class RenderHistory:
+    """SQLite-backed store of card versions with tile-level deduplication"""
+
+    def __init__(self, directory: str = DEFAULT_STORE):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.directory / "history.sqlite")
+        self.db.executescript(SCHEMA)
+
+    def _put_blob(self, data: bytes) -> str:
+        key = hashlib.sha1(data).hexdigest()
+        # Image tiles are already compressed; everything else is deflated
+        stored = data if _is_webp(data) else zlib.compress(data, 6)
+        self.db.execute("INSERT OR IGNORE INTO blobs VALUES (?, ?)", (key, stored))
+        return key
+
+    def _get_blob(self, key: str) -> bytes:
+        row = self.db.execute("SELECT data FROM blobs WHERE hash = ?", (key,)).fetchone()
+        data = row[0]
+        return data if _is_webp(data) else zlib.decompress(data)
+
+    def add(self, html_path: str, image_path: str, timings: dict = None, scores: dict = None,
+            label: str = None) -> int:
+        """Record one render; returns its version number"""
+        pixels = load_rgba(image_path)
+        height, width = pixels.shape[:2]
+        tiles = []
+        for y, x in _tile_grid(height, width):
+            block = pixels[y:y + TILE, x:x + TILE]
+            if (block[..., 3] == 255).all():
+                block = block[..., :3]
+            buffer = io.BytesIO()
+            Image.fromarray(np.ascontiguousarray(block)).save(
+                buffer, "WEBP", lossless=True, exact=True, quality=50, method=2)
+            tiles.append(self._put_blob(buffer.getvalue()))
+
+        html_hash = self._put_blob(Path(html_path).read_bytes())
+        cursor = self.db.execute(
+            "INSERT INTO versions (created, label, html_path, html_hash, width, height, tile, tiles,"
+            " timings, score, scores) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (time.time(), label, str(html_path), html_hash, width, height, TILE, json.dumps(tiles),
+             json.dumps(timings) if timings else None,
+             scores["score"] if scores else None,
+             json.dumps(scores) if scores else None),
+        )
+        self.db.commit()
+        return cursor.lastrowid
+
+    _COLUMNS = "version, created, label, html_path, html_hash, width, height, tiles, timings, score"
+
+    @staticmethod
+    def _entry(row) -> dict:
+        return {
+            "version": row[0],
+            "created": row[1],
+            "label": row[2],
+            "html_path": row[3],
+            "html_hash": row[4],
+            "size": [row[5], row[6]],
+            "tiles": json.loads(row[7]),
+            "timings": json.loads(row[8]) if row[8] else None,
+            "score": row[9],
+        }
+
+    def versions(self) -> list:
+        rows = self.db.execute(f"SELECT {self._COLUMNS} FROM versions ORDER BY version").fetchall()
+        return [self._entry(row) for row in rows]
+
+    def version(self, number: int) -> dict:
+        row = self.db.execute(f"SELECT {self._COLUMNS} FROM versions WHERE version = ?", (number,)).fetchone()
+        if row is None:
+            raise KeyError(f"no version {number}")
+        return self._entry(row)
+
+    def best(self):
+        row = self.db.execute(
+            "SELECT version FROM versions WHERE score IS NOT NULL ORDER BY score DESC, version DESC LIMIT 1"
+        ).fetchone()
+        return self.version(row[0]) if row else None
+
+    def diff(self, a: int, b: int) -> dict:
+        """Changed tiles and HTML lines between two versions"""
+        old, new = self.version(a), self.version(b)
+        result = {"from": a, "to": b, "size_changed": old["size"] != new["size"]}
+        if not result["size_changed"]:
+            width, height = new["size"]
+            grid = _tile_grid(height, width)
+            changed = [grid[i] for i, (x, y) in enumerate(zip(old["tiles"], new["tiles"])) if x != y]
+            result["changed_tiles"] = len(changed)
+            result["total_tiles"] = len(grid)
+            if changed:
+                result["changed_box"] = [
+                    min(x for _, x in changed), min(y for y, _ in changed),
+                    min(width, max(x for _, x in changed) + TILE), min(height, max(y for y, _ in changed) + TILE),
+                ]
+        result["html_diff"] = list(difflib.unified_diff(
+            self._get_blob(old["html_hash"]).decode(errors="replace").splitlines(),
+            self._get_blob(new["html_hash"]).decode(errors="replace").splitlines(),
+            f"v{a}", f"v{b}", lineterm="",
+        )) if old["html_hash"] != new["html_hash"] else []
+        return result
+
+    def image(self, number: int) -> np.ndarray:
+        """Reassemble a version's screenshot from its tiles"""
+        entry = self.version(number)
+        width, height = entry["size"]
+        pixels = np.empty((height, width, 4), dtype=np.uint8)
+        for (y, x), key in zip(_tile_grid(height, width), entry["tiles"]):
+            with Image.open(io.BytesIO(self._get_blob(key))) as img:
+                block = np.asarray(img.convert("RGBA"))
+            pixels[y:y + block.shape[0], x:x + block.shape[1]] = block
+        return pixels
+
+    def html(self, number: int) -> bytes:
+        return self._get_blob(self.version(number)["html_hash"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Versioned render history")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="history directory (default: .history)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add = subparsers.add_parser("add", help="record a render")
+    add.add_argument("html_file")
+    add.add_argument("image")
+    add.add_argument("--target", help="score the image against this target")
+    add.add_argument("--label")
+    subparsers.add_parser("list", help="list versions")
+    subparsers.add_parser("best", help="show the best scoring version")
+    diff = subparsers.add_parser("diff", help="compare two versions")
+    diff.add_argument("a", type=int)
+    diff.add_argument("b", type=int)
+    export = subparsers.add_parser("export", help="write a version's screenshot (and HTML)")
+    export.add_argument("version", type=int)
+    export.add_argument("output_image")
+    export.add_argument("--html", help="also write the version's HTML here")
+    args = parser.parse_args()
+
+    history = RenderHistory(args.store)
+
+    if args.command == "add":
+        scores = None
+        if args.target:
+            from similarity import compare
+            scores = compare(load_rgba(args.target), load_rgba(args.image))
+        version = history.add(args.html_file, args.image, scores=scores, label=args.label)
+        score = f", score {scores['score']:.4f}" if scores else ""
+        print(f"✓ Recorded v{version}{score}")
+
+    elif args.command == "list":
+        previous = None
+        for entry in history.versions():
+            changed = ""
+            if previous is not None and previous["size"] == entry["size"]:
+                count = sum(x != y for x, y in zip(previous["tiles"], entry["tiles"]))
+                changed = f"{count}/{len(entry['tiles'])} tiles changed"
+            score = f"{entry['score']:.4f}" if entry["score"] is not None else "-"
+            stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["created"]))
+            print(f"v{entry['version']:<4} {stamp}  score {score:<7} {changed}  {entry['label'] or ''}")
+            previous = entry
+
+    elif args.command == "best":
+        entry = history.best()
+        if entry is None:
+            print("No scored versions")
+            sys.exit(1)
+        print(f"v{entry['version']}: score {entry['score']:.4f} ({entry['html_path']})")
+
+    elif args.command == "diff":
+        result = history.diff(args.a, args.b)
+        if result["size_changed"]:
+            print(f"v{args.a} -> v{args.b}: image size changed")
+        else:
+            print(f"v{args.a} -> v{args.b}: {result['changed_tiles']}/{result['total_tiles']} tiles changed"
+                  + (f", box {result['changed_box']}" if result["changed_tiles"] else ""))
+        for line in result["html_diff"]:
+            print(line)
+
+    else:
+        Image.fromarray(history.image(args.version)).save(args.output_image)
+        if args.html:
+            Path(args.html).write_bytes(history.html(args.version))
+        print(f"✓ v{args.version} saved to: {args.output_image}")
+
+
+if __name__ == "__main__":
+    main()
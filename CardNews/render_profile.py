@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Per-stage render timing
+
+Every render records a span per stage (browser launch, context, goto,
+readiness and its font/image/layout signals, screenshot, file write, cache
+lookup). Spans travel inside the render result, so jobs rendered by the
+render server are profiled the same way as local ones. Chromium's own
+Performance.getMetrics counters can be added on request.
+
+The Profiler collects results (one render or a whole batch) and writes them
+as JSON lines, as a Chrome trace (open in chrome://tracing or
+https://ui.perfetto.dev), or as a per-stage breakdown table.
+
+Used through --profile, --profile-jsonl, --trace and --metrics on
+html_to_image.py and batch_render.py.
+"""
+
+import json
+import math
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# Chromium Performance.getMetrics counters worth reporting
+CHROME_METRICS = (
+    "TaskDuration", "ScriptDuration", "LayoutDuration", "RecalcStyleDuration",
+    "LayoutCount", "RecalcStyleCount", "JSHeapUsedSize", "Nodes",
+)
+
+
+class StageTimer:
+    """Collects timing spans for one render job"""
+
+    def __init__(self):
+        self.spans = []
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, start, (time.time() - start) * 1000)
+
+    def add(self, name: str, start: float, dur_ms: float):
+        self.spans.append({"name": name, "ts": start, "dur_ms": round(dur_ms, 2)})
+
+
+async def chrome_metrics(page) -> dict:
+    """Selected Chromium performance counters for a page (durations in ms)"""
+    session = await page.context.new_cdp_session(page)
+    try:
+        await session.send("Performance.enable")
+        response = await session.send("Performance.getMetrics")
+    finally:
+        await session.detach()
+    metrics = {}
+    for metric in response["metrics"]:
+        if metric["name"] in CHROME_METRICS:
+            value = metric["value"]
+            metrics[metric["name"]] = round(value * 1000, 2) if metric["name"].endswith("Duration") else value
+    return metrics
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+class Profiler:
+    """Aggregates the spans of one or many render results"""
+
+    def __init__(self):
+        self.results = []
+
+    def add(self, result: dict):
+        if result.get("spans"):
+            self.results.append(result)
+
+    def records(self) -> list:
+        """One JSON-able record per span"""
+        records = []
+        for result in self.results:
+            for span in result["spans"]:
+                records.append({"job": result.get("output_path"), "stage": span["name"],
+                                "ts": span["ts"], "dur_ms": span["dur_ms"]})
+            if result.get("metrics"):
+                records.append({"job": result.get("output_path"), "stage": "chrome_metrics",
+                                "metrics": result["metrics"]})
+        return records
+
+    def write_jsonl(self, path: str):
+        """JSON lines, one per span; `-` writes to stdout"""
+        out = sys.stdout if path == "-" else open(path, "a")
+        try:
+            for record in self.records():
+                out.write(json.dumps(record) + "\n")
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+    def write_trace(self, path: str):
+        """Chrome trace event file; each job gets its own track"""
+        events = []
+        for tid, result in enumerate(self.results, start=1):
+            events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                           "args": {"name": os.path.basename(result.get("output_path") or f"job {tid}")}})
+            for span in result["spans"]:
+                events.append({
+                    "name": span["name"], "ph": "X", "pid": os.getpid(), "tid": tid,
+                    "ts": round(span["ts"] * 1e6), "dur": round(span["dur_ms"] * 1000),
+                })
+            if result.get("metrics"):
+                end = max(s["ts"] + s["dur_ms"] / 1000 for s in result["spans"])
+                events.append({"name": "chrome_metrics", "ph": "i", "s": "t", "pid": os.getpid(),
+                               "tid": tid, "ts": round(end * 1e6), "args": result["metrics"]})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def breakdown(self) -> list:
+        """Per-stage count, total, mean, p50 and p95 over all collected jobs"""
+        stages = {}
+        for result in self.results:
+            for span in result["spans"]:
+                stages.setdefault(span["name"], []).append(span["dur_ms"])
+        return [{
+            "stage": name,
+            "count": len(values),
+            "total_ms": round(sum(values), 1),
+            "mean_ms": round(sum(values) / len(values), 1),
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+        } for name, values in stages.items()]
+
+    def print_breakdown(self):
+        rows = self.breakdown()
+        if not rows:
+            print("No profiling data")
+            return
+        print(f"\n{'stage':<18}{'count':>6}{'total ms':>11}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for row in rows:
+            print(f"{row['stage']:<18}{row['count']:>6}{row['total_ms']:>11.1f}{row['mean_ms']:>10.1f}"
+                  f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}")
+        metrics = [r["metrics"] for r in self.results if r.get("metrics")]
+        if metrics:
+            print("\nchrome metrics (mean)")
+            for name in CHROME_METRICS:
+                values = [m[name] for m in metrics if name in m]
+                if values:
+                    print(f"  {name:<22}{sum(values) / len(values):>12.1f}")
+
+
+def add_profile_arguments(parser):
+    """--profile, --profile-jsonl, --trace and --metrics for a render CLI"""
+    parser.add_argument("--profile", action="store_true", help="print a per-stage timing breakdown")
+    parser.add_argument("--profile-jsonl", metavar="FILE", help="append per-stage timings as JSON lines (- for stdout)")
+    parser.add_argument("--trace", metavar="FILE", help="write a Chrome trace (chrome://tracing / Perfetto)")
+    parser.add_argument("--metrics", action="store_true", help="collect Chromium performance metrics")
+
+
+def report(profiler: Profiler, args):
+    """Emit whatever the profiling flags asked for"""
+    if args.profile_jsonl:
+        profiler.write_jsonl(args.profile_jsonl)
+    if args.trace:
+        profiler.write_trace(args.trace)
+        print(f"✓ Trace saved to: {args.trace}")
+    if args.profile:
+        profiler.print_breakdown()
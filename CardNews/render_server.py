@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Warm render server for html_to_image.py
+
+Keeps a pool of Chromium browsers (and one context per device scale factor
+inside each browser) alive on a local Unix socket, so renders skip the
+browser launch. html_to_image() sends jobs here automatically and only falls
+back to a cold launch when no server is running.
+
+Usage:
+    python3 render_server.py start [--browsers N] [--recycle-after N] [--socket PATH]
+    python3 render_server.py status [--socket PATH]
+    python3 render_server.py stop [--socket PATH]
+
+Protocol: one JSON request per line, one JSON response per line.
+    {"op": "render", "job": {...}}  ->  {"ok": true, "result": {...}}
+    {"op": "stats"}                 ->  {"ok": true, "result": {...}}
+    {"op": "ping"} / {"op": "shutdown"}
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+
+from renderer import new_context, render_on_page
+
+DEFAULT_SOCKET = os.environ.get(
+    "CARDNEWS_RENDER_SOCKET",
+    os.path.join(tempfile.gettempdir(), "cardnews-render.sock"),
+)
+
+
+class BrowserSlot:
+    """One warm browser plus its contexts, keyed by device scale factor"""
+
+    def __init__(self, playwright, recycle_after: int):
+        self.playwright = playwright
+        self.recycle_after = recycle_after
+        self.browser = None
+        self.contexts = {}  # scale -> [context, renders]
+
+    async def ensure_browser(self):
+        if self.browser is None or not self.browser.is_connected():
+            self.browser = await self.playwright.chromium.launch()
+            self.contexts = {}
+        return self.browser
+
+    async def context_for(self, scale):
+        await self.ensure_browser()
+        entry = self.contexts.get(scale)
+        if entry is None:
+            entry = [await new_context(self.browser, scale), 0]
+            self.contexts[scale] = entry
+        return entry
+
+    async def drop_context(self, scale):
+        entry = self.contexts.pop(scale, None)
+        if entry is not None:
+            try:
+                await entry[0].close()
+            except Exception:
+                pass
+
+    async def render(self, job: dict) -> dict:
+        entry = await self.context_for(job["scale"])
+        page = await entry[0].new_page()
+        try:
+            result = await render_on_page(page, job)
+        finally:
+            if not page.is_closed():
+                await page.close()
+
+        # Recycle contexts after N renders to keep memory bounded
+        entry[1] += 1
+        if entry[1] >= self.recycle_after:
+            await self.drop_context(job["scale"])
+        return result
+
+    async def close(self):
+        for scale in list(self.contexts):
+            await self.drop_context(scale)
+        if self.browser is not None and self.browser.is_connected():
+            await self.browser.close()
+
+
+class RenderPool:
+    """Pool of warm browser slots; each slot renders one job at a time"""
+
+    def __init__(self, browsers: int = 2, recycle_after: int = 50):
+        self.size = browsers
+        self.recycle_after = recycle_after
+        self.slots = asyncio.Queue()
+        self.stats = {"jobs": 0, "errors": 0, "crashes": 0, "total_ms": 0.0}
+        self._playwright = None
+        self._manager = None
+
+    async def start(self):
+        from playwright.async_api import async_playwright
+
+        self._manager = async_playwright()
+        self._playwright = await self._manager.start()
+        for _ in range(self.size):
+            slot = BrowserSlot(self._playwright, self.recycle_after)
+            await slot.ensure_browser()
+            self.slots.put_nowait(slot)
+
+    async def render(self, job: dict) -> dict:
+        started = time.perf_counter()
+        slot = await self.slots.get()
+        try:
+            try:
+                result = await slot.render(job)
+            except Exception as exc:
+                if not _looks_like_crash(exc):
+                    raise
+                # Crashed page or browser: throw the context away and retry once
+                self.stats["crashes"] += 1
+                await slot.drop_context(job["scale"])
+                result = await slot.render(job)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.slots.put_nowait(slot)
+
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.stats["jobs"] += 1
+        self.stats["total_ms"] += latency_ms
+        result["latency_ms"] = latency_ms
+        result["mode"] = "warm"
+        return result
+
+    def snapshot(self) -> dict:
+        jobs = self.stats["jobs"]
+        return {
+            **self.stats,
+            "browsers": self.size,
+            "recycle_after": self.recycle_after,
+            "avg_ms": round(self.stats["total_ms"] / jobs, 1) if jobs else None,
+        }
+
+    async def close(self):
+        while not self.slots.empty():
+            await self.slots.get_nowait().close()
+        if self._manager is not None:
+            await self._manager.__aexit__(None, None, None)
+
+
+def _looks_like_crash(exc: Exception) -> bool:
+    message = str(exc).lower()
+    return any(word in message for word in ("crash", "target closed", "has been closed"))
+
+
+async def serve(socket_path: str = DEFAULT_SOCKET, browsers: int = 2, recycle_after: int = 50):
+    """Run the render server until a shutdown request arrives"""
+    if os.path.exists(socket_path):
+        if request({"op": "ping"}, socket_path) is not None:
+            print(f"Error: render server already running on {socket_path}")
+            sys.exit(1)
+        os.unlink(socket_path)  # stale socket from a crashed server
+
+    pool = RenderPool(browsers, recycle_after)
+    await pool.start()
+    stop = asyncio.Event()
+
+    async def handle(reader, writer):
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            message = json.loads(line)
+            op = message.get("op")
+            if op == "render":
+                job = message["job"]
+                try:
+                    result = await pool.render(job)
+                    response = {"ok": True, "result": result}
+                    print(f"✓ {job['html_path']} -> {result['output_path']} ({result['latency_ms']} ms)")
+                except Exception as exc:
+                    response = {"ok": False, "error": str(exc)}
+                    print(f"✗ {job['html_path']}: {exc}")
+            elif op == "stats":
+                response = {"ok": True, "result": pool.snapshot()}
+            elif op == "ping":
+                response = {"ok": True}
+            elif op == "shutdown":
+                response = {"ok": True}
+                stop.set()
+            else:
+                response = {"ok": False, "error": f"unknown op: {op}"}
+            writer.write((json.dumps(response) + "\n").encode())
+            await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_unix_server(handle, path=socket_path)
+    print(f"✓ Render server listening on {socket_path} ({browsers} browsers, recycle after {recycle_after})")
+    try:
+        await stop.wait()
+    finally:
+        server.close()
+        await server.wait_closed()
+        await pool.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+    print("✓ Render server stopped")
+
+
+def request(message: dict, socket_path: str = DEFAULT_SOCKET, timeout: float = 120.0):
+    """Send one request to the render server; returns None if no server is running
+
+    Raises RuntimeError when a server is there but the exchange fails
+    (timeout, reset connection); it may still be working on the job, so
+    rendering it again elsewhere could race it for the output file.
+    """
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            sock.sendall((json.dumps(message) + "\n").encode())
+            with sock.makefile("rb") as stream:
+                line = stream.readline()
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    except OSError as exc:
+        raise RuntimeError(f"render server on {socket_path} did not answer: {exc!r}") from exc
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def render_via_server(job: dict, socket_path: str = DEFAULT_SOCKET):
+    """Render a job on the warm server; returns None if no server is running"""
+    response = request({"op": "render", "job": job}, socket_path)
+    if response is None:
+        return None
+    if not response["ok"]:
+        raise RuntimeError(response["error"])
+    return response["result"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm render server for html_to_image.py")
+    parser.add_argument("command", choices=["start", "status", "stop"])
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket path")
+    parser.add_argument("--browsers", type=int, default=2, help="number of warm browsers")
+    parser.add_argument("--recycle-after", type=int, default=50,
+                        help="recreate a context after this many renders")
+    args = parser.parse_args()
+
+    if args.command == "start":
+        try:
+            asyncio.run(serve(args.socket, args.browsers, args.recycle_after))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    op = "stats" if args.command == "status" else "shutdown"
+    try:
+        response = request({"op": op}, args.socket)
+    except RuntimeError as exc:
+        print(f"Error: {exc}")
+        sys.exit(1)
+    if response is None:
+        print(f"No render server running on {args.socket}")
+        sys.exit(1)
+    if args.command == "status":
+        print(json.dumps(response["result"], indent=2))
+    else:
+        print("✓ Shutdown requested")
+
+
+if __name__ == "__main__":
+    main()
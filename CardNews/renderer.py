@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Shared async rendering core.
+
+html_to_image.py (cold launch) and render_server.py (warm pool) both render
+through the functions here, so a job produces the same pixels whichever path
+handled it.
+
+A job is a plain dict so it can travel over the render server socket:
+
+    {
+        "html_path": "/abs/path/card.html",
+        "output_path": "/abs/path/output.png",
+        "viewport": {"width": 1280, "height": 720},
+        "scale": 1,
+        "full_page": true,
+        "ready_timeout_ms": 5000,
+        "metrics": false,
+        "dirty": null
+    }
+
+`dirty` is None for a normal render, or the path of the previous PNG (or "")
+for a dirty-region render, see dirty_regions.py.
+
+Pages are considered ready by page_ready.wait_until_ready(), and remote
+assets are served from page_ready.AssetCache, so renders need no network
+once the cache is warm. Each render records per-stage timing spans
+(render_profile.py) in its result.
+"""
+
+import time
+from pathlib import Path
+
+from dirty_regions import capture as capture_dirty
+from page_ready import DEFAULT_TIMEOUT_MS, AssetCache, wait_until_ready
+from render_profile import StageTimer, chrome_metrics
+
+DEFAULT_VIEWPORT = {"width": 1280, "height": 720}
+
+
+def make_job(html_path, output_path, viewport=None, scale=1, full_page=True,
+             ready_timeout_ms=DEFAULT_TIMEOUT_MS, metrics=False, dirty=None) -> dict:
+    """Build a render job with absolute paths and defaults filled in"""
+    return {
+        "html_path": str(Path(html_path).resolve()),
+        "output_path": str(Path(output_path).resolve()),
+        "viewport": dict(viewport or DEFAULT_VIEWPORT),
+        "scale": scale,
+        "full_page": full_page,
+        "ready_timeout_ms": ready_timeout_ms,
+        "metrics": metrics,
+        "dirty": str(Path(dirty).resolve()) if dirty else dirty,
+    }
+
+
+async def new_context(browser, scale=1, asset_cache: AssetCache = None):
+    """Create a browser context for the given device scale factor, with remote assets cached"""
+    context = await browser.new_context(
+        viewport=DEFAULT_VIEWPORT,
+        device_scale_factor=scale,
+    )
+    await (asset_cache or AssetCache()).install(context)
+    return context
+
+
+async def render_on_page(page, job: dict, timer: StageTimer = None) -> dict:
+    """Render one job on an already-open page and write the screenshot"""
+    started = time.perf_counter()
+    timer = timer or StageTimer()
+
+    output_path = Path(job["output_path"])
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with timer.span("viewport"):
+        await page.set_viewport_size(job["viewport"])
+
+    # Requests that failed (e.g. web fonts aborted offline) leave fallback pixels
+    failed = []
+
+    def on_failed(request):
+        failed.append(request.url)
+
+    page.on("requestfailed", on_failed)
+    try:
+        # Load HTML file
+        with timer.span("goto"):
+            await page.goto(Path(job["html_path"]).as_uri(), wait_until="load")
+
+        # Wait for fonts, images and layout instead of network idle
+        ready_start = time.time()
+        with timer.span("ready"):
+            ready = await wait_until_ready(page, job.get("ready_timeout_ms", DEFAULT_TIMEOUT_MS))
+    finally:
+        page.remove_listener("requestfailed", on_failed)
+    ready["failed_requests"] = failed
+    previous = 0.0
+    for signal in ("fonts", "images", "layout"):
+        if signal in ready["timings_ms"]:
+            at = ready["timings_ms"][signal]
+            timer.add(f"ready.{signal}", ready_start + previous / 1000, at - previous)
+            previous = at
+
+    # Take screenshot (only the changed regions in dirty mode)
+    dirty = None
+    if job.get("dirty") is not None:
+        dirty = await capture_dirty(page, job, timer)
+    else:
+        with timer.span("screenshot"):
+            image = await page.screenshot(full_page=job["full_page"])
+        with timer.span("write"):
+            output_path.write_bytes(image)
+
+    result = {
+        "output_path": str(output_path),
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        "ready": ready,
+        "spans": timer.spans,
+    }
+    if dirty is not None:
+        result["dirty"] = dirty
+    if job.get("metrics"):
+        result["metrics"] = await chrome_metrics(page)
+    return result
+
+
+async def render_cold(job: dict) -> dict:
+    """Launch a fresh browser, render a single job and shut everything down"""
+    from playwright.async_api import async_playwright
+
+    started = time.perf_counter()
+    timer = StageTimer()
+    async with async_playwright() as p:
+        with timer.span("launch"):
+            browser = await p.chromium.launch()
+        with timer.span("context"):
+            context = await new_context(browser, job["scale"])
+            page = await context.new_page()
+        result = await render_on_page(page, job, timer)
+        with timer.span("close"):
+            await browser.close()
+
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    result["mode"] = "cold"
+    return result
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Target vs output similarity scoring
+
+Scores how close a rendered card (outputs/output_v{n}.png) is to the target
+image. Both images are brought to the same size (the larger one is
+downscaled), then compared with a per-pixel RGB difference and a windowed
+SSIM on luminance. Results are reported globally and per tile, with the
+worst tiles ranked first.
+
+    score = ssim * (1 - pixel_diff)      1.0 means identical
+
+Usage:
+    python3 similarity.py <target_image> <output_image|directory> [...] [--tiles N] [--top K]
+        [--heatmap-dir DIR] [--json]
+
+Example:
+    python3 similarity.py example2/target.png example2/outputs --heatmap-dir example2/outputs/heatmaps
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from pixels import load_rgba
+
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+SSIM_WINDOW = 8
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+
+def aligned_size(target: np.ndarray, output: np.ndarray) -> tuple:
+    """(width, height) both images are compared at: the smaller one's size"""
+    th, tw = target.shape[:2]
+    oh, ow = output.shape[:2]
+    return (ow, oh) if tw * th > ow * oh else (tw, th)
+
+
+def align(target: np.ndarray, output: np.ndarray) -> tuple:
+    """Resize the larger image down to the smaller one's size"""
+    if target.shape == output.shape:
+        return target, output
+    size = aligned_size(target, output)
+    if (target.shape[1], target.shape[0]) != size:
+        target = np.asarray(Image.fromarray(target).resize(size, Image.BOX))
+    else:
+        output = np.asarray(Image.fromarray(output).resize(size, Image.BOX))
+    return target, output
+
+
+def crop_aligned(image: np.ndarray, size: tuple, box: tuple) -> np.ndarray:
+    """Region `box` (x0, y0, x1, y1) of `image` as it would look after resizing it to `size`
+
+    Only the source pixels under the box are resampled, with the same filter
+    positions as resizing the whole image, so the crop matches align() (up to
+    pixels whose filter edge falls on a rounding tie, which the usual 1.5x, 2x
+    and 3x device scale ratios never produce).
+    """
+    x0, y0, x1, y1 = box
+    h, w = image.shape[:2]
+    if (w, h) == tuple(size):
+        return image[y0:y1, x0:x1]
+    bx0, bx1 = x0 * w / size[0], x1 * w / size[0]
+    by0, by1 = y0 * h / size[1], y1 * h / size[1]
+    ix0, iy0 = int(bx0), int(by0)
+    ix1, iy1 = min(w, int(np.ceil(bx1))), min(h, int(np.ceil(by1)))
+    region = Image.fromarray(np.ascontiguousarray(image[iy0:iy1, ix0:ix1]))
+    return np.asarray(region.resize((x1 - x0, y1 - y0), Image.BOX,
+                                    box=(bx0 - ix0, by0 - iy0, bx1 - ix0, by1 - iy0)))
+
+
+def _box_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Mean over a window x window box centred on each pixel (reflected at the borders)"""
+    pad = window // 2
+    padded = np.pad(values, ((pad, window - pad - 1), (pad, window - pad - 1)), mode="reflect")
+    table = np.zeros((padded.shape[0] + 1, padded.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(padded, axis=0, dtype=np.float64), axis=1, out=table[1:, 1:])
+    h, w = values.shape
+    sums = (table[window:window + h, window:window + w] - table[:h, window:window + w]
+            - table[window:window + h, :w] + table[:h, :w])
+    return (sums / (window * window)).astype(np.float32)
+
+
+def ssim_map(a: np.ndarray, b: np.ndarray, window: int = SSIM_WINDOW) -> np.ndarray:
+    """Per-pixel SSIM of two luminance images"""
+    mu_a = _box_mean(a, window)
+    mu_b = _box_mean(b, window)
+    var_a = _box_mean(a * a, window) - mu_a * mu_a
+    var_b = _box_mean(b * b, window) - mu_b * mu_b
+    cov = _box_mean(a * b, window) - mu_a * mu_b
+    return ((2 * mu_a * mu_b + SSIM_C1) * (2 * cov + SSIM_C2)) / (
+        (mu_a * mu_a + mu_b * mu_b + SSIM_C1) * (var_a + var_b + SSIM_C2))
+
+
+def tile_bounds(size: int, tiles: int) -> np.ndarray:
+    """Edges of `tiles` near-equal spans covering `size` pixels"""
+    return np.arange(tiles + 1) * size // tiles
+
+
+def tile_means(values: np.ndarray, tiles: int) -> np.ndarray:
+    """Mean of a 2-D map over each cell of a tiles x tiles grid"""
+    ys = tile_bounds(values.shape[0], tiles)
+    xs = tile_bounds(values.shape[1], tiles)
+    sums = np.add.reduceat(np.add.reduceat(values, ys[:-1], axis=0), xs[:-1], axis=1)
+    return sums / np.outer(np.diff(ys), np.diff(xs))
+
+
+def tile_stats(target: np.ndarray, output: np.ndarray, tiles: int = 8, cells: list = None) -> tuple:
+    """Per-tile mean SSIM and pixel difference of two RGBA arrays, compared at the smaller size
+
+    With `cells`, only those (row, col) tiles are computed (others are NaN).
+    Each tile is cropped with a margin of one SSIM window before resizing, so
+    its values match what the full-image pass would give without resampling
+    the rest of the image.
+    """
+    if cells is None:
+        target, output = align(target, output)
+        rgb_t = target[..., :3].astype(np.float32)
+        rgb_o = output[..., :3].astype(np.float32)
+        diff = np.abs(rgb_t - rgb_o).mean(axis=2) / 255
+        ssim = ssim_map(rgb_t @ LUMA_WEIGHTS, rgb_o @ LUMA_WEIGHTS)
+        return tile_means(ssim, tiles), tile_means(diff, tiles)
+
+    w, h = aligned_size(target, output)
+    ys = tile_bounds(h, tiles)
+    xs = tile_bounds(w, tiles)
+    tile_ssim = np.full((tiles, tiles), np.nan)
+    tile_diff = np.full((tiles, tiles), np.nan)
+    for row, col in cells:
+        y0, y1, x0, x1 = ys[row], ys[row + 1], xs[col], xs[col + 1]
+        py0, py1 = max(0, y0 - SSIM_WINDOW), min(h, y1 + SSIM_WINDOW)
+        px0, px1 = max(0, x0 - SSIM_WINDOW), min(w, x1 + SSIM_WINDOW)
+        rgb_t = crop_aligned(target, (w, h), (px0, py0, px1, py1))[..., :3].astype(np.float32)
+        rgb_o = crop_aligned(output, (w, h), (px0, py0, px1, py1))[..., :3].astype(np.float32)
+        inner = (slice(y0 - py0, y1 - py0), slice(x0 - px0, x1 - px0))
+        tile_diff[row, col] = (np.abs(rgb_t - rgb_o).mean(axis=2) / 255)[inner].mean()
+        tile_ssim[row, col] = ssim_map(rgb_t @ LUMA_WEIGHTS, rgb_o @ LUMA_WEIGHTS)[inner].mean()
+    return tile_ssim, tile_diff
+
+
+def summarize(tile_ssim: np.ndarray, tile_diff: np.ndarray, size: tuple, top: int = 5) -> dict:
+    """Global score and worst regions from per-tile statistics of a (width, height) image"""
+    w, h = size
+    tiles = tile_ssim.shape[0]
+    ys = tile_bounds(h, tiles)
+    xs = tile_bounds(w, tiles)
+    tile_score = tile_ssim * (1 - tile_diff)
+
+    worst = []
+    for index in np.argsort(tile_score, axis=None)[:top]:
+        row, col = divmod(int(index), tiles)
+        worst.append({
+            "row": row,
+            "col": col,
+            "box": [int(xs[col]), int(ys[row]), int(xs[col + 1]), int(ys[row + 1])],
+            "score": round(float(tile_score[row, col]), 4),
+            "ssim": round(float(tile_ssim[row, col]), 4),
+            "pixel_diff": round(float(tile_diff[row, col]), 4),
+        })
+
+    # Tiles partition the image, so area-weighted tile means are the global means
+    areas = np.outer(np.diff(ys), np.diff(xs)) / (w * h)
+    global_ssim = float((tile_ssim * areas).sum())
+    global_diff = float((tile_diff * areas).sum())
+    return {
+        "score": round(global_ssim * (1 - global_diff), 4),
+        "ssim": round(global_ssim, 4),
+        "pixel_diff": round(global_diff, 4),
+        "size": [w, h],
+        "tiles": tiles,
+        "tile_scores": np.round(tile_score, 4).tolist(),
+        "worst_regions": worst,
+    }
+
+
+def compare(target: np.ndarray, output: np.ndarray, tiles: int = 8, top: int = 5) -> dict:
+    """Global and per-tile similarity of two RGBA arrays"""
+    target, output = align(target, output)
+    tile_ssim, tile_diff = tile_stats(target, output, tiles)
+    return summarize(tile_ssim, tile_diff, (target.shape[1], target.shape[0]), top)
+
+
+def write_heatmap(target: np.ndarray, output: np.ndarray, path: str):
+    """Overlay the per-pixel difference (black -> red -> yellow) on a dimmed target"""
+    target, output = align(target, output)
+    diff = np.abs(target[..., :3].astype(np.float32) - output[..., :3]).mean(axis=2) / 255
+    base = (target[..., :3].astype(np.float32) @ LUMA_WEIGHTS)[..., None] * 0.4
+    heat = np.clip(diff * 4, 0, 1)[..., None]
+    color = np.concatenate([np.clip(heat * 2, 0, 1), np.clip(heat * 2 - 1, 0, 1), np.zeros_like(heat)], axis=2)
+    image = np.clip(base + color * 255 * 0.8, 0, 255).astype(np.uint8)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(image).save(path)
+
+
+def score_files(target_path: str, output_paths: list, tiles: int = 8, top: int = 5,
+                heatmap_dir: str = None) -> list:
+    """Score several output images against one target, decoding the target once"""
+    target = load_rgba(target_path)
+    results = []
+    for output_path in output_paths:
+        started = time.perf_counter()
+        output = load_rgba(output_path)
+        result = compare(target, output, tiles, top)
+        if heatmap_dir:
+            heatmap = Path(heatmap_dir) / f"{Path(output_path).stem}_heatmap.png"
+            write_heatmap(target, output, heatmap)
+            result["heatmap"] = str(heatmap)
+        result["output"] = str(output_path)
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        results.append(result)
+    return results
+
+
+def _version_key(path: Path):
+    # output_v2 before output_v10
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", path.name)]
+
+
+def expand_outputs(paths: list, target_path: str) -> list:
+    """Expand directories into their PNG files (in version order), skipping the target and heatmaps"""
+    target = Path(target_path).resolve()
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(
+                (p for p in path.glob("*.png")
+                 if p.resolve() != target and not p.stem.endswith("_heatmap")),
+                key=_version_key,
+            ))
+        else:
+            files.append(path)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score rendered cards against a target image")
+    parser.add_argument("target")
+    parser.add_argument("outputs", nargs="+", help="output images or directories of them")
+    parser.add_argument("--tiles", type=int, default=8, help="tiles per side (default: 8)")
+    parser.add_argument("--top", type=int, default=5, help="worst regions to report")
+    parser.add_argument("--heatmap-dir", help="write a difference heatmap per output here")
+    parser.add_argument("--json", action="store_true", help="print full results as JSON")
+    args = parser.parse_args()
+
+    outputs = expand_outputs(args.outputs, args.target)
+    if not outputs:
+        print("Error: no output images to score")
+        sys.exit(1)
+
+    results = score_files(args.target, outputs, args.tiles, args.top, args.heatmap_dir)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        print(f"{result['output']}: score {result['score']:.4f} "
+              f"(ssim {result['ssim']:.4f}, diff {result['pixel_diff']:.4f}, {result['elapsed_ms']} ms)")
+        for region in result["worst_regions"]:
+            print(f"    tile r{region['row']} c{region['col']} {region['box']}: {region['score']:.4f}")
+    best = max(results, key=lambda r: r["score"])
+    print(f"✓ Best: {best['output']} ({best['score']:.4f})")
+
+
+if __name__ == "__main__":
+    main()
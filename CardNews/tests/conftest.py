@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# The CardNews modules import each other as top-level scripts
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Keep decoded-pixel cache writes out of the user's cache directory
+os.environ.setdefault("CARDNEWS_PIXEL_CACHE", tempfile.mkdtemp(prefix="cardnews-pixels-"))
@@ -0,0 +1,31 @@
+import json
+
+from benchmark import compare, summarize
+
+
+def _results(path, **medians):
+    results = {name: summarize([value], "ms") for name, value in medians.items()}
+    path.write_text(json.dumps({"results": results}))
+    return path
+
+
+def test_compare_flags_slowdowns_beyond_threshold(tmp_path, capsys):
+    baseline = _results(tmp_path / "baseline.json", a=100, b=100)
+    current = _results(tmp_path / "current.json", a=105, b=130)
+    assert compare(baseline, current, 10) == ["b"]
+
+
+def test_compare_zero_baseline_is_not_new(tmp_path, capsys):
+    baseline = _results(tmp_path / "baseline.json", steady=0, grew=0)
+    current = _results(tmp_path / "current.json", steady=0, grew=5)
+    assert compare(baseline, current, 10) == ["grew"]
+    assert "new" not in capsys.readouterr().out
+
+
+def test_compare_reports_metrics_missing_from_current_run(tmp_path, capsys):
+    baseline = _results(tmp_path / "baseline.json", kept=1, dropped=1)
+    current = _results(tmp_path / "current.json", kept=1, added=1)
+    assert compare(baseline, current, 10) == []
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split() for line in lines if "dropped" in line or "added" in line] == [
+        ["added", "new"], ["dropped", "missing"]]
@@ -0,0 +1,170 @@
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from dirty_regions import dirty_rects, load_snapshot, merge_rects, save_snapshot, score_dirty, snapshot_path
+from similarity import align, compare, tile_stats
+
+
+def _box(path, box, signature="s"):
+    return {"path": path, "box": box, "signature": signature}
+
+
+def test_merge_rects_chained_overlaps():
+    # The third rect bridges the first two, which only then overlap each other
+    rects = [[0, 0, 10, 10], [20, 0, 30, 10], [9, 2, 21, 8], [50, 50, 60, 60]]
+    assert sorted(merge_rects(rects)) == [[0, 0, 30, 10], [50, 50, 60, 60]]
+
+
+def test_merge_rects_keeps_disjoint_rects():
+    rects = [[0, 0, 10, 10], [11, 11, 20, 20]]
+    assert sorted(merge_rects(rects)) == rects
+
+
+def test_dirty_rects_added_removed_moved_and_restyled():
+    previous = {"boxes": [
+        _box("HTML", [0, 0, 200, 200]),
+        _box("HTML/0:P", [10, 10, 20, 10]),                # unchanged
+        _box("HTML/1:P", [10, 40, 20, 10]),                # moved
+        _box("HTML/2:P", [10, 80, 20, 10]),                # removed
+        _box("HTML/3:P", [10, 120, 20, 10], "old"),        # restyled
+    ]}
+    current = {"boxes": [
+        _box("HTML", [0, 0, 200, 200]),
+        _box("HTML/0:P", [10, 10, 20, 10]),
+        _box("HTML/1:P", [100, 40, 20, 10]),
+        _box("HTML/3:P", [10, 120, 20, 10], "new"),
+        _box("HTML/4:P", [100, 160, 30.5, 10.2]),          # added
+    ]}
+    rects = dirty_rects(previous, current, (200, 200), margin=0)
+    assert sorted(rects) == [
+        [10, 40, 30, 50],      # moved: old box
+        [10, 80, 30, 90],      # removed
+        [10, 120, 30, 130],    # restyled
+        [100, 40, 120, 50],    # moved: new box
+        [100, 160, 131, 171],  # added, rounded outwards
+    ]
+
+
+def test_dirty_rects_margin_is_clamped_to_bounds():
+    previous = {"boxes": []}
+    current = {"boxes": [_box("HTML/0:P", [2, 190, 10, 10]), _box("HTML/1:P", [50, 50, 0, 10])]}
+    # zero-size boxes are ignored
+    assert dirty_rects(previous, current, (200, 200), margin=8) == [[0, 182, 20, 200]]
+
+
+def test_dirty_rects_unchanged_page_is_clean():
+    snapshot = {"boxes": [_box("HTML", [0, 0, 200, 200]), _box("HTML/0:P", [10, 10, 20, 10])]}
+    assert dirty_rects(snapshot, json.loads(json.dumps(snapshot)), (200, 200)) == []
+
+
+def _images(seed=0, size=(90, 100)):
+    rng = np.random.default_rng(seed)
+    target = rng.integers(0, 256, (*size, 4), dtype=np.uint8)
+    target[..., 3] = 255
+    output = np.clip(target.astype(int) + rng.integers(-40, 40, target.shape), 0, 255).astype(np.uint8)
+    output[..., 3] = 255
+    return target, output
+
+
+def test_partial_tile_stats_match_full_pass():
+    target, output = _images()
+    full_ssim, full_diff = tile_stats(target, output, 8)
+    cells = [(r, c) for r in range(8) for c in range(8)]
+    part_ssim, part_diff = tile_stats(target, output, 8, cells)
+    np.testing.assert_allclose(part_ssim, full_ssim, atol=1e-6)
+    np.testing.assert_allclose(part_diff, full_diff, atol=1e-6)
+
+
+@pytest.mark.parametrize("scale", [2, 1.5])
+def test_partial_tile_stats_crop_before_resizing(scale):
+    # The larger image is only resampled under each tile, matching a full align()
+    target, output = _images(2, (90, 100))
+    output = np.asarray(Image.fromarray(output).resize((int(100 * scale), int(90 * scale)), Image.NEAREST))
+    full_ssim, full_diff = tile_stats(*align(target, output), 4)
+    cells = [(r, c) for r in range(4) for c in range(4)]
+    part_ssim, part_diff = tile_stats(target, output, 4, cells)
+    np.testing.assert_allclose(part_ssim, full_ssim, atol=1e-4)
+    np.testing.assert_allclose(part_diff, full_diff, atol=1e-4)
+
+
+def test_partial_tile_stats_leave_other_tiles_nan():
+    target, output = _images()
+    full_ssim, _ = tile_stats(target, output, 4)
+    part_ssim, part_diff = tile_stats(target, output, 4, [(0, 1), (3, 3)])
+    computed = ~np.isnan(part_ssim)
+    assert computed.sum() == 2 and computed[0, 1] and computed[3, 3]
+    assert np.isnan(part_diff).sum() == 14
+    np.testing.assert_allclose(part_ssim[computed], full_ssim[computed], atol=1e-6)
+
+
+SIZE = 64
+
+
+@pytest.fixture
+def renders(tmp_path):
+    """A target, a scored previous render and a current render that differs in its top-left corner"""
+    target, previous = _images(1, (SIZE, SIZE))
+    current = previous.copy()
+    current[:10, :10, :3] = 255 - current[:10, :10, :3]
+
+    paths = {name: tmp_path / f"{name}.png" for name in ("target", "previous", "current")}
+    for name, pixels in (("target", target), ("previous", previous), ("current", current)):
+        Image.fromarray(pixels).save(paths[name])
+    snapshot = {"boxes": [], "viewport": {"width": SIZE, "height": SIZE}, "scale": 1,
+                "full_page": False, "width": SIZE, "height": SIZE}
+    save_snapshot(paths["previous"], dict(snapshot))
+    save_snapshot(paths["current"], dict(snapshot))
+    score_dirty(paths["target"], paths["previous"], {"full": True, "previous": None, "rects": []}, tiles=4)
+    return paths
+
+
+def _dirty(paths):
+    return {"full": False, "previous": str(paths["previous"]), "rects": [[0, 0, 10, 10]]}
+
+
+def test_score_dirty_rescores_only_changed_tiles(renders):
+    result = score_dirty(renders["target"], renders["current"], _dirty(renders), tiles=4)
+    assert result["rescored_tiles"] == 1
+    full = compare(np.asarray(Image.open(renders["target"]).convert("RGBA")),
+                   np.asarray(Image.open(renders["current"]).convert("RGBA")), 4)
+    np.testing.assert_allclose(result["tile_scores"], full["tile_scores"], atol=1e-4)
+    assert result["score"] == pytest.approx(full["score"], abs=1e-4)
+
+
+def test_score_dirty_falls_back_when_tiles_change(renders):
+    result = score_dirty(renders["target"], renders["current"], _dirty(renders), tiles=8)
+    assert result["rescored_tiles"] == 64
+
+
+def test_score_dirty_falls_back_when_target_changes(renders, tmp_path):
+    other = tmp_path / "other_target.png"
+    other.write_bytes(renders["target"].read_bytes())
+    result = score_dirty(other, renders["current"], _dirty(renders), tiles=4)
+    assert result["rescored_tiles"] == 16
+
+
+def test_score_dirty_falls_back_when_size_changes(renders):
+    path = snapshot_path(renders["previous"])
+    snapshot = json.loads(path.read_text())
+    snapshot["scores"]["size"] = [SIZE * 2, SIZE * 2]
+    path.write_text(json.dumps(snapshot))
+    result = score_dirty(renders["target"], renders["current"], _dirty(renders), tiles=4)
+    assert result["rescored_tiles"] == 16
+
+
+def test_score_dirty_full_capture_rescores_everything(renders):
+    dirty = dict(_dirty(renders), full=True)
+    result = score_dirty(renders["target"], renders["current"], dirty, tiles=4)
+    assert result["rescored_tiles"] == 16
+
+
+def test_snapshot_is_ignored_once_its_image_is_rewritten(renders):
+    assert load_snapshot(renders["previous"]) is not None
+    # e.g. a normal render or a render-cache hit overwrote the PNG
+    renders["previous"].write_bytes(renders["current"].read_bytes())
+    assert load_snapshot(renders["previous"]) is None
+    result = score_dirty(renders["target"], renders["current"], _dirty(renders), tiles=4)
+    assert result["rescored_tiles"] == 16
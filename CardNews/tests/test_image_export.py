@@ -0,0 +1,35 @@
+import hashlib
+
+import numpy as np
+from PIL import Image
+
+from image_export import Exporter, encode, output_path_for, parse_specs
+
+SPECS = parse_specs("1:png,1:png-opt,1:webp:5,1:jpeg,0.5:png")
+
+
+def _digest(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def test_parallel_exports_match_serial_encodes(tmp_path):
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (96, 128, 4), dtype=np.uint8)
+    pixels[..., 3] = 255
+    rendered = tmp_path / "card.png"
+    Image.fromarray(pixels).save(rendered)
+
+    expected = {}
+    for scale, fmt, quality in SPECS:
+        path = tmp_path / f"serial-{fmt}-{scale:g}"
+        with Image.open(rendered) as img:
+            encode(img.copy(), 1, scale, fmt, quality, path)
+        expected[output_path_for(rendered, scale, fmt)] = _digest(path)
+
+    for _ in range(15):
+        exporter = Exporter(SPECS, workers=len(SPECS))
+        exporter.submit(str(rendered), 1)
+        rows = exporter.results()
+        assert [row["format"] for row in rows] == [fmt for _, fmt, _ in SPECS]
+        for path, digest in expected.items():
+            assert _digest(path) == digest, path.name
@@ -0,0 +1,51 @@
+import numpy as np
+
+from layout_analysis import find_bands, text_bands
+
+
+def test_find_bands_groups_busy_rows():
+    counts = np.array([0] * 5 + [10] * 12 + [0] * 3 + [20] * 9 + [0] * 4)
+    assert find_bands(counts) == [(5, 12), (20, 9)]
+
+
+def test_find_bands_requires_more_than_min_band_rows():
+    counts = np.array([0] + [10] * 8 + [0] + [10] * 9 + [0])
+    # exactly min_band rows is not enough
+    assert find_bands(counts, min_band=8) == [(10, 9)]
+
+
+def test_find_bands_drops_band_open_at_bottom_edge():
+    counts = np.array([0] * 3 + [10] * 12 + [0] * 2 + [10] * 20)
+    assert find_bands(counts) == [(3, 12)]
+
+
+def test_find_bands_ignores_rows_at_noise_level():
+    counts = np.array([0] + [5] * 12 + [0] + [6] * 12 + [0])
+    assert find_bands(counts, noise=5) == [(14, 12)]
+
+
+def _plate(height=60, width=80):
+    background = np.zeros((height, width, 4), dtype=np.uint8)
+    background[..., :3] = (240, 240, 230)
+    background[..., 3] = 255
+    return background
+
+
+def test_text_bands_extent_and_colour():
+    background = _plate()
+    reference = background.copy()
+    reference[10:22, 15:61, :3] = (200, 30, 30)
+    reference[10:22, 61:71, :3] = (200, 31, 30)
+    reference[40:45, 0:80, :3] = (0, 0, 0)  # too short to be a band
+    assert text_bands(reference, background) == [{
+        "top": 10, "height": 12, "left": 15, "right": 70, "width": 55,
+        # 46 x 30 + 10 x 31 over 56 columns: 30.18, like JS Math.round
+        "color": "rgb(200, 30, 30)",
+    }]
+
+
+def test_text_bands_ignores_text_touching_the_bottom_edge():
+    background = _plate()
+    reference = background.copy()
+    reference[45:60, 10:70, :3] = (0, 0, 0)
+    assert text_bands(reference, background) == []
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from page_ready import AssetCache
+
+URL = "https://fonts.example.com/title.woff2"
+
+
+class _Request:
+    def __init__(self, method):
+        self.url = URL
+        self.method = method
+
+
+class _Response:
+    ok = True
+    status = 200
+    headers = {"content-type": "font/woff2"}
+
+    async def body(self):
+        return b"font"
+
+
+class _Route:
+    """Records what the cache does with one intercepted request"""
+
+    def __init__(self, method="GET"):
+        self.request = _Request(method)
+        self.outcome = None
+
+    async def fetch(self):
+        return _Response()
+
+    async def fulfill(self, **kwargs):
+        self.outcome = ("fulfill", kwargs)
+
+    async def continue_(self):
+        self.outcome = ("continue", {})
+
+    async def abort(self, reason):
+        self.outcome = ("abort", reason)
+
+
+def test_put_then_get_leaves_no_temp_files(tmp_path):
+    cache = AssetCache(tmp_path, offline=False)
+    cache.put(URL, 200, {"content-type": "font/woff2"}, b"font")
+    meta, body = cache.get(URL)
+    assert meta == {"url": URL, "status": 200, "content_type": "font/woff2"}
+    assert body.read_bytes() == b"font"
+    assert sorted(p.suffix for p in tmp_path.iterdir()) == [".body", ".json"]
+
+
+def test_get_responses_are_cached_and_served_from_disk(tmp_path):
+    cache = AssetCache(tmp_path, offline=False)
+    asyncio.run(cache.handle(route := _Route()))
+    assert route.outcome[0] == "fulfill" and cache.get(URL) is not None
+
+    offline = AssetCache(tmp_path, offline=True)
+    asyncio.run(offline.handle(route := _Route()))
+    assert route.outcome[0] == "fulfill" and route.outcome[1]["path"].endswith(".body")
+
+
+@pytest.mark.parametrize("offline, outcome", [(False, "continue"), (True, "abort")])
+def test_other_methods_bypass_the_cache(tmp_path, offline, outcome):
+    cache = AssetCache(tmp_path, offline=offline)
+    cache.put(URL, 200, {}, b"cached GET body")
+    asyncio.run(cache.handle(route := _Route("POST")))
+    assert route.outcome[0] == outcome
+    fresh = AssetCache(tmp_path / "fresh", offline=False)
+    asyncio.run(fresh.handle(_Route("POST")))
+    assert fresh.get(URL) is None
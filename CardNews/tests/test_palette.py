@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from palette import _histograms, _kmeans, region_palettes
+
+
+def _opaque(rgb):
+    return np.concatenate([rgb, np.full(rgb.shape[:2] + (1,), 255, dtype=np.uint8)], axis=2)
+
+
+def test_shares_sum_to_one_per_palette():
+    rng = np.random.default_rng(0)
+    image = _opaque(rng.integers(0, 256, (40, 60, 3), dtype=np.uint8))
+    regions = [(0, 20, 0, 60), (20, 40, 0, 30), (20, 40, 30, 60)]
+    for result in region_palettes(image, regions, k=5):
+        palette = result["all"]["palette"]
+        assert len(palette) == 5
+        assert sum(entry["share"] for entry in palette) == pytest.approx(1, abs=1e-3)
+
+
+def test_region_with_fewer_occupied_bins_than_k():
+    image = np.zeros((10, 20, 3), dtype=np.uint8)
+    image[:, :5] = (200, 30, 30)
+    image[:, 5:] = (20, 20, 120)
+    [result] = region_palettes(_opaque(image), [(0, 10, 0, 20)], k=5)
+    assert result["all"] == {"pixels": 200, "palette": [
+        {"color": "rgb(20, 20, 120)", "share": 0.75},
+        {"color": "rgb(200, 30, 30)", "share": 0.25},
+    ]}
+
+
+def test_mask_splits_foreground_and_background():
+    image = np.full((10, 10, 3), 240, dtype=np.uint8)
+    image[2:5, 2:8] = (10, 10, 10)
+    mask = np.zeros((10, 10), dtype=bool)
+    mask[2:5, 2:8] = True
+    [result] = region_palettes(_opaque(image), [(0, 10, 0, 10)], mask, k=3)
+    assert result["foreground"] == {"pixels": 18, "palette": [{"color": "rgb(10, 10, 10)", "share": 1.0}]}
+    assert result["background"] == {"pixels": 82, "palette": [{"color": "rgb(240, 240, 240)", "share": 1.0}]}
+
+
+def test_batched_kmeans_matches_one_group_at_a_time():
+    rng = np.random.default_rng(1)
+    image = _opaque(rng.integers(0, 256, (30, 30, 3), dtype=np.uint8))
+    regions = [(0, 15, 0, 30), (15, 30, 0, 30)]
+    counts, sums = _histograms(image, regions, None, 4)
+    centroids, weights = _kmeans(counts, sums, 4, 4)
+    for group in range(len(regions)):
+        alone, alone_weights = _kmeans(counts[group:group + 1], sums[group:group + 1], 4, 4)
+        np.testing.assert_allclose(centroids[group], alone[0])
+        np.testing.assert_allclose(weights[group], alone_weights[0])
+    np.testing.assert_allclose(weights.sum(axis=1), counts.sum(axis=1))
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+from pixels import PixelCache, file_digest, load_rgba
+
+
+def _image(path, value):
+    pixels = np.full((32, 48, 3), value, dtype=np.uint8)
+    Image.fromarray(pixels).save(path)
+    return path
+
+
+def test_cached_load_matches_decode_and_is_read_only(tmp_path):
+    path = _image(tmp_path / "a.png", 10)
+    cache = PixelCache(tmp_path / "cache")
+    first = cache.load(path)
+    again = cache.load(path, digest=file_digest(path))
+    np.testing.assert_array_equal(first, load_rgba(path))
+    np.testing.assert_array_equal(again, first)
+    assert not first.flags.writeable
+    assert cache.stats()["entries"] == 1
+
+    resized = cache.load(path, (24, 16))
+    assert resized.shape == (16, 24, 4)
+    assert cache.stats()["entries"] == 2
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    cache = PixelCache(tmp_path / "cache")
+    paths = [_image(tmp_path / f"{i}.png", i) for i in range(3)]
+    for i, path in enumerate(paths):
+        cache.load(path)
+    entries = {path.name: path for path, _, _ in cache.entries()}
+    # make the first image the most recently used and the second the oldest
+    for age, path in ((300, paths[1]), (200, paths[2]), (0, paths[0])):
+        entry = entries[f"{file_digest(path)}.npy"]
+        os.utime(entry, (entry.stat().st_atime, entry.stat().st_mtime - age))
+
+    size = cache.entries()[0][1]
+    assert cache.prune(2 * size) == 1
+    remaining = {path.name for path, _, _ in cache.entries()}
+    assert f"{file_digest(paths[1])}.npy" not in remaining
+    assert len(remaining) == 2
+
+
+def test_store_respects_size_cap(tmp_path):
+    cache = PixelCache(tmp_path / "cache", max_mb=0.007)  # room for one 32x48 RGBA decode
+    for i in range(3):
+        cache.load(_image(tmp_path / f"{i}.png", i))
+    assert cache.stats()["entries"] == 1
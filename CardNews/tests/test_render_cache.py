@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from render_cache import RenderCache, cache_key, local_assets
+
+
+@pytest.fixture
+def card(tmp_path):
+    """A card whose stylesheet imports another and references a font and an image"""
+    (tmp_path / "fonts").mkdir()
+    (tmp_path / "fonts" / "title.woff2").write_bytes(b"font")
+    (tmp_path / "bg.png").write_bytes(b"png")
+    (tmp_path / "base.css").write_text('@font-face { src: url("fonts/title.woff2"); }')
+    (tmp_path / "style.css").write_text('@import "base.css";\nbody { background: url(bg.png); }')
+    html = tmp_path / "card.html"
+    html.write_text('<link rel="stylesheet" href="style.css">'
+                    '<img src="https://example.com/logo.png"><img src="data:image/png;base64,AAAA">'
+                    '<a href="#top"></a><div>card</div>')
+    return html
+
+
+def _job(html, **overrides):
+    return {"html_path": str(html), "viewport": {"width": 720, "height": 720}, "scale": 1,
+            "full_page": True, **overrides}
+
+
+def test_local_assets_follow_stylesheets_and_skip_remote_urls(card):
+    root = card.parent.resolve()
+    assert local_assets(card) == {root / "style.css", root / "base.css", root / "bg.png",
+                                  root / "fonts" / "title.woff2"}
+
+
+def test_local_assets_survive_import_cycles(tmp_path):
+    (tmp_path / "a.css").write_text('@import "b.css";')
+    (tmp_path / "b.css").write_text('@import url("a.css");')
+    html = tmp_path / "card.html"
+    html.write_text('<link rel="stylesheet" href="a.css">')
+    assert local_assets(html) == {(tmp_path / "a.css").resolve(), (tmp_path / "b.css").resolve()}
+
+
+def test_cache_key_covers_html_assets_and_capture_settings(card):
+    key = cache_key(_job(card))
+    assert cache_key(_job(card)) == key
+
+    changed = set()
+    for job in (_job(card, viewport={"width": 1080, "height": 1080}), _job(card, scale=2),
+                _job(card, full_page=False)):
+        changed.add(cache_key(job))
+
+    (card.parent / "fonts" / "title.woff2").write_bytes(b"other font")
+    changed.add(cache_key(_job(card)))
+    card.write_text(card.read_text().replace("card</div>", "card v2</div>"))
+    changed.add(cache_key(_job(card)))
+
+    assert key not in changed and len(changed) == 5
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    for i, name in enumerate(("old", "mid", "new")):
+        image = tmp_path / f"{name}.png"
+        image.write_bytes(bytes(100))
+        cache.store(name, image)
+        os.utime(cache.directory / f"{name}.png", (1000 + i, 1000 + i))
+
+    assert cache.fetch("old", tmp_path / "out.png")  # now the most recently used
+    assert cache.prune(max_bytes=250) == 1
+    assert sorted(path.stem for path, _, _ in cache.entries()) == ["new", "old"]
+
+
+def test_stats_treat_unreadable_counters_as_zero(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    cache.directory.mkdir()
+    cache.stats_path.write_text('{"hits": 3, "mis')  # torn write
+    assert cache.stats()["hits"] == 0
+
+    assert not cache.fetch("missing", tmp_path / "out.png")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (0, 1)
+    assert [p.name for p in cache.directory.iterdir()] == ["stats.json"]
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from render_history import TILE, RenderHistory
+
+
+def _card(path, pixels):
+    Image.fromarray(pixels).save(path)
+    return path
+
+
+@pytest.fixture
+def screenshot():
+    # Not a multiple of the tile size, so edge tiles are partial
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (150, 200, 4), dtype=np.uint8)
+    pixels[..., 3] = 255
+    pixels[:TILE, :TILE, 3] = rng.integers(0, 256, (TILE, TILE))  # one translucent tile
+    return pixels
+
+
+def _blobs(history):
+    return history.db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+
+
+def test_image_round_trips_losslessly(tmp_path, screenshot):
+    history = RenderHistory(tmp_path / "history")
+    html = tmp_path / "card.html"
+    html.write_text("<p>v1</p>")
+    version = history.add(html, _card(tmp_path / "v1.png", screenshot))
+    np.testing.assert_array_equal(history.image(version), screenshot)
+    assert history.html(version) == b"<p>v1</p>"
+
+
+def test_identical_render_adds_no_blobs(tmp_path, screenshot):
+    history = RenderHistory(tmp_path / "history")
+    html = tmp_path / "card.html"
+    html.write_text("<p>v1</p>")
+    image = _card(tmp_path / "v1.png", screenshot)
+    history.add(html, image)
+    blobs = _blobs(history)
+    history.add(html, image)
+    assert _blobs(history) == blobs
+    assert [entry["version"] for entry in history.versions()] == [1, 2]
+
+
+def test_diff_reports_changed_tiles_and_html(tmp_path, screenshot):
+    history = RenderHistory(tmp_path / "history")
+    html = tmp_path / "card.html"
+    html.write_text("<h1>Title</h1>\n<p>v1</p>")
+    history.add(html, _card(tmp_path / "v1.png", screenshot), scores={"score": 0.5})
+
+    changed = screenshot.copy()
+    changed[140:150, 130:140, :3] = 255 - changed[140:150, 130:140, :3]  # bottom-right tile only
+    html.write_text("<h1>Title</h1>\n<p>v2</p>")
+    blobs = _blobs(history)
+    history.add(html, _card(tmp_path / "v2.png", changed), scores={"score": 0.75})
+    assert _blobs(history) == blobs + 2  # one tile and the HTML
+
+    result = history.diff(1, 2)
+    assert (result["changed_tiles"], result["total_tiles"]) == (1, 12)
+    assert result["changed_box"] == [128, 128, 192, 150]
+    assert [line for line in result["html_diff"] if line[:1] in "+-" and line[:3] not in ("---", "+++")] == [
+        "-<p>v1</p>", "+<p>v2</p>"]
+    assert history.best()["version"] == 2